@@ -0,0 +1,152 @@
+import asyncio
+from typing import AsyncIterator
+
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.utils import sse_event
+from app.schemas import (
+    DiagramToTextResponse,
+    ErrorResponse,
+    JobStatsResponse,
+    JobStatusResponse,
+    JobSubmitResponse,
+)
+from app.services.diagram_to_text import run_diagram_to_text
+from app.services.job_queue import JobManager, QueueFullError
+from app.services.job_store import FAILED, Job
+
+router = APIRouter(prefix="/api/v1/jobs")
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def _manager(request: Request) -> JobManager:
+    return request.app.state.job_manager
+
+
+def _status(job: Job) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        expires_at=job.expires_at,
+        error=job.error,
+    )
+
+
+async def _get_job(request: Request, job_id: str) -> Job:
+    job = await _manager(request).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+
+@router.post(
+    "/diagram-to-text",
+    status_code=202,
+    response_model=JobSubmitResponse,
+    responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}},
+    summary="Submit a diagram-to-text job",
+)
+async def submit_diagram_to_text(request: Request, image: UploadFile = File(...)) -> JobSubmitResponse:
+    if image is None or not image.filename:
+        raise HTTPException(status_code=400, detail="Image file is required.")
+
+    manager = _manager(request)
+    try:
+        job = await manager.submit(
+            "diagram-to-text", run_diagram_to_text, image.filename, await image.read(), image.content_type
+        )
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        ) from exc
+
+    base_url = f"/api/v1/jobs/{job.id}"
+    return JobSubmitResponse(
+        job_id=job.id,
+        status=job.status,
+        status_url=base_url,
+        result_url=f"{base_url}/result",
+        events_url=f"{base_url}/events",
+    )
+
+
+@router.get("/stats", response_model=JobStatsResponse, summary="Job queue statistics")
+async def job_stats(request: Request) -> JobStatsResponse:
+    manager = _manager(request)
+    stored = await asyncio.to_thread(manager.store.count_by_status)
+    return JobStatsResponse(**manager.stats(), stored=stored)
+
+
+@router.get(
+    "/{job_id}",
+    response_model=JobStatusResponse,
+    responses={404: {"model": ErrorResponse}},
+    summary="Job status",
+)
+async def job_status(request: Request, job_id: str) -> JobStatusResponse:
+    return _status(await _get_job(request, job_id))
+
+
+@router.get(
+    "/{job_id}/result",
+    response_model=DiagramToTextResponse,
+    responses={202: {"model": JobStatusResponse}, 404: {"model": ErrorResponse}, 502: {"model": ErrorResponse}},
+    summary="Job result",
+)
+async def job_result(request: Request, job_id: str):
+    job = await _get_job(request, job_id)
+    if job.status == FAILED:
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    if not job.done:
+        return JSONResponse(
+            status_code=202,
+            content=_status(job).model_dump(),
+            headers={"Retry-After": str(_manager(request).retry_after())},
+        )
+    return DiagramToTextResponse(**job.result)
+
+
+async def _job_events(manager: JobManager, job_id: str, job: Job) -> AsyncIterator[str]:
+    updates = manager.subscribe(job_id)
+    try:
+        # Re-read after subscribing so a transition in between is not missed
+        job = await manager.get(job_id) or job
+        while True:
+            yield sse_event("status", _status(job).model_dump())
+            if job.done:
+                if job.status == FAILED:
+                    yield sse_event("error", {"status": job.error_status, "detail": job.error})
+                else:
+                    yield sse_event("result", job.result)
+                return
+            while True:
+                try:
+                    await asyncio.wait_for(updates.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    # Nothing publishes when a job expires, so check for it here
+                    if await manager.get(job_id) is None:
+                        break
+            job = await manager.get(job_id)
+            if job is None:
+                yield sse_event("error", {"status": 404, "detail": "Job not found or expired."})
+                return
+    finally:
+        manager.unsubscribe(job_id, updates)
+
+
+@router.get("/{job_id}/events", responses={404: {"model": ErrorResponse}}, summary="Job status events (SSE)")
+async def job_events(request: Request, job_id: str) -> StreamingResponse:
+    job = await _get_job(request, job_id)
+    return StreamingResponse(
+        _job_events(_manager(request), job_id, job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,18 +1,21 @@
-import json
-from typing import Dict
+import asyncio
+from typing import Any, AsyncIterator, Dict
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
 
-from app.clients.llm_client import call_llm
+from app.clients.http_pool import pool_stats
+from app.clients.llm_client import call_llm, stream_llm
 from app.clients.pipeline_client import call_pipeline
 from app.core.config import settings
-from app.core.utils import extract_code_block
+from app.core.utils import CodeBlockStream, extract_code_block, sse_event
 from app.schemas import (
     DiagramToTextResponse,
     ErrorResponse,
     TextToDiagramRequest,
     TextToDiagramResponse,
 )
+from app.services.diagram_to_text import build_description_prompt
 
 router = APIRouter()
 
@@ -22,6 +25,11 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
+@router.get("/api/v1/upstreams/stats", summary="Upstream connection pool usage")
+async def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    return pool_stats()
+
+
 @router.post(
     "/api/v1/diagram-to-text",
     response_model=DiagramToTextResponse,
@@ -30,10 +38,7 @@ async def health() -> Dict[str, str]:
 )
 async def diagram_to_text(image: UploadFile = File(...)) -> DiagramToTextResponse:
     pipeline_payload = await call_pipeline(image)
-    prompt_payload = json.dumps(pipeline_payload, ensure_ascii=False)
-    # Replace only the explicit placeholder to avoid KeyError from other braces in the template.
-    prompt = settings.prompt_bpmn_to_text.replace("{payload}", prompt_payload)
-    description = await call_llm(prompt)
+    description = await call_llm(build_description_prompt(pipeline_payload))
     return DiagramToTextResponse(description=description, pipeline=pipeline_payload)
 
 
@@ -52,3 +57,103 @@ async def text_to_diagram(payload: TextToDiagramRequest) -> TextToDiagramRespons
     diagram_code = await call_llm(prompt)
     diagram_code = extract_code_block(diagram_code)
     return TextToDiagramResponse(diagramCode=diagram_code)
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def _until_disconnected(request: Request, events: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Relays events until the client disconnects, then cancels the pending LLM read.
+
+    Cancelling closes the upstream connection, so llama.cpp stops generating
+    instead of finishing a reply nobody will read.
+    """
+
+    async def disconnected() -> None:
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.__anext__())
+            await asyncio.wait({next_event, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                await asyncio.gather(next_event, return_exceptions=True)
+                return
+            try:
+                yield next_event.result()
+            except StopAsyncIteration:
+                return
+    finally:
+        watcher.cancel()
+        await events.aclose()
+
+
+def _event_stream(request: Request, events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        _until_disconnected(request, events), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+async def _description_events(pipeline_payload: Dict[str, Any]) -> AsyncIterator[str]:
+    yield sse_event("pipeline", pipeline_payload)
+    description = ""
+    try:
+        async for delta in stream_llm(build_description_prompt(pipeline_payload)):
+            if not description:
+                delta = delta.lstrip()
+                if not delta:
+                    continue
+            description += delta
+            yield sse_event("delta", {"text": delta})
+    except HTTPException as exc:
+        yield sse_event("error", {"status": exc.status_code, "detail": exc.detail})
+        return
+    yield sse_event("result", {"description": description.strip()})
+
+
+async def _diagram_code_events(prompt: str) -> AsyncIterator[str]:
+    code = CodeBlockStream()
+    try:
+        async for delta in stream_llm(prompt):
+            reset, text = code.feed(delta)
+            if reset:
+                yield sse_event("reset", {"text": text})
+            elif text:
+                yield sse_event("delta", {"text": text})
+    except HTTPException as exc:
+        yield sse_event("error", {"status": exc.status_code, "detail": exc.detail})
+        return
+    reset, text = code.finish()
+    if reset:
+        yield sse_event("reset", {"text": text})
+    elif text:
+        yield sse_event("delta", {"text": text})
+    yield sse_event("result", {"diagramCode": extract_code_block(code.text)})
+
+
+@router.post(
+    "/api/v1/diagram-to-text/stream",
+    responses={400: {"model": ErrorResponse}, 502: {"model": ErrorResponse}},
+    summary="Convert diagram image to text, streaming the description (SSE)",
+)
+async def diagram_to_text_stream(request: Request, image: UploadFile = File(...)) -> StreamingResponse:
+    # Pipeline errors are still reported as HTTP status codes, before the stream starts
+    pipeline_payload = await call_pipeline(image)
+    return _event_stream(request, _description_events(pipeline_payload))
+
+
+@router.post(
+    "/api/v1/text-to-diagram/stream",
+    responses={400: {"model": ErrorResponse}},
+    summary="Convert text to Mermaid, streaming the code (SSE)",
+)
+async def text_to_diagram_stream(request: Request, payload: TextToDiagramRequest) -> StreamingResponse:
+    description = payload.description.strip()
+    if not description:
+        raise HTTPException(status_code=400, detail="Description is required.")
+
+    prompt = settings.prompt_text_to_mermaid.replace("{description}", description)
+    return _event_stream(request, _diagram_code_events(prompt))
@@ -0,0 +1,184 @@
+import importlib.util
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamPool:
+    """Long-lived httpx client for one upstream, with saturation counters.
+
+    The client is created once (in the app lifespan, or lazily on first use) and
+    reuses keep-alive connections. At most max_connections requests are in flight;
+    the rest wait up to pool_timeout for a free connection and then fail with 503.
+    """
+
+    def __init__(self, name: str, label: str, base_url: str, max_connections: int, max_keepalive: int,
+                 keepalive_expiry: float, connect_timeout: float, read_timeout: float, write_timeout: float,
+                 pool_timeout: float, http2: bool = False):
+        self.name = name
+        self.label = label
+        self.base_url = base_url
+        self.max_connections = max(1, max_connections)
+        self.limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=min(max_keepalive, self.max_connections),
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout
+        )
+        self.http2 = http2 and self._http2_available()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self._counters = {
+            "requests": 0,
+            "saturated": 0,
+            "pool_timeouts": 0,
+            "timeouts": 0,
+            "connect_errors": 0,
+            "errors": 0,
+        }
+
+    def _http2_available(self) -> bool:
+        if importlib.util.find_spec("h2") is not None:
+            return True
+        logger.warning("HTTP/2 requested for %s but h2 is not installed; using HTTP/1.1", self.name)
+        return False
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, timeout=self.timeout, http2=self.http2
+            )
+        return self._client
+
+    def open(self) -> None:
+        self.client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _begin(self) -> float:
+        self._counters["requests"] += 1
+        if self._in_flight >= self.max_connections:
+            # Every connection is busy: this request waits in the pool
+            self._counters["saturated"] += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        return time.monotonic()
+
+    def _end(self, started: float) -> None:
+        self._in_flight -= 1
+        self._latencies.append(time.monotonic() - started)
+
+    def _upstream_error(self, exc: httpx.HTTPError) -> HTTPException:
+        if isinstance(exc, httpx.PoolTimeout):
+            self._counters["pool_timeouts"] += 1
+            return HTTPException(status_code=503, detail=f"{self.label} connection pool is exhausted.")
+        if isinstance(exc, httpx.TimeoutException):
+            self._counters["timeouts"] += 1
+            return HTTPException(status_code=504, detail=f"{self.label} timed out.")
+        if isinstance(exc, httpx.ConnectError):
+            self._counters["connect_errors"] += 1
+            return HTTPException(status_code=502, detail=f"{self.label} is unreachable.")
+        self._counters["errors"] += 1
+        return HTTPException(status_code=502, detail=f"{self.label} request failed.")
+
+    async def request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        started = self._begin()
+        try:
+            return await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as exc:
+            raise self._upstream_error(exc) from exc
+        finally:
+            self._end(started)
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Streamed request; leaving the block early closes the connection, which stops the upstream."""
+        started = self._begin()
+        try:
+            async with self.client.stream(method, path, **kwargs) as response:
+                yield response
+        except httpx.HTTPError as exc:
+            raise self._upstream_error(exc) from exc
+        finally:
+            self._end(started)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "utilization": round(self._in_flight / self.max_connections, 3),
+            **self._counters,
+            "latency_ms_avg": round(1000 * sum(latencies) / len(latencies), 1) if latencies else 0.0,
+            "latency_ms_p95": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)
+            if latencies else 0.0,
+        }
+
+
+llm_pool = UpstreamPool(
+    name="llm",
+    label="LLM",
+    base_url=settings.llm_url,
+    max_connections=settings.llm_max_connections,
+    max_keepalive=settings.llm_max_keepalive,
+    keepalive_expiry=settings.http_keepalive_expiry,
+    connect_timeout=settings.http_connect_timeout,
+    read_timeout=settings.llm_read_timeout,
+    write_timeout=settings.http_timeout,
+    pool_timeout=settings.llm_pool_timeout,
+    http2=settings.llm_http2,
+)
+
+pipeline_pool = UpstreamPool(
+    name="pipeline",
+    label="Pipeline",
+    base_url=settings.pipeline_url,
+    max_connections=settings.pipeline_max_connections,
+    max_keepalive=settings.pipeline_max_keepalive,
+    keepalive_expiry=settings.http_keepalive_expiry,
+    connect_timeout=settings.http_connect_timeout,
+    read_timeout=settings.pipeline_read_timeout,
+    write_timeout=settings.http_timeout,
+    pool_timeout=settings.pipeline_pool_timeout,
+    http2=settings.pipeline_http2,
+)
+
+UPSTREAM_POOLS = (llm_pool, pipeline_pool)
+
+
+def open_pools() -> None:
+    for pool in UPSTREAM_POOLS:
+        pool.open()
+
+
+async def close_pools() -> None:
+    for pool in UPSTREAM_POOLS:
+        await pool.close()
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    return {pool.name: pool.stats() for pool in UPSTREAM_POOLS}
@@ -1,27 +1,32 @@
-from typing import Any, Dict
-import os
+import json
+from typing import Any, AsyncIterator, Dict
 
-import httpx
 from fastapi import HTTPException
 
+from app.clients.http_pool import llm_pool
 from app.core.config import settings
 
 
-async def call_llm(prompt: str) -> str:
+def _chat_payload(prompt: str, stream: bool = False) -> Dict[str, Any]:
     if not prompt.strip():
         raise HTTPException(status_code=400, detail="Prompt is empty.")
 
-    headers = {"Content-Type": "application/json"}
-
     payload: Dict[str, Any] = {
         "model": settings.llm_model,
         "messages": [{"role": "user", "content": prompt}],
         "temperature": settings.llm_temperature,
         "max_tokens": settings.llm_max_tokens,
     }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+async def call_llm(prompt: str) -> str:
+    headers = {"Content-Type": "application/json"}
+    payload = _chat_payload(prompt)
 
-    async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
-        response = await client.post(f"{settings.llm_url}/v1/chat/completions", json=payload, headers=headers)
+    response = await llm_pool.post("/v1/chat/completions", json=payload, headers=headers)
 
     if response.status_code >= 400:
         raise HTTPException(status_code=502, detail=f"LLM error: {response.status_code}")
@@ -33,3 +38,31 @@ async def call_llm(prompt: str) -> str:
         raise HTTPException(status_code=502, detail="LLM response format unexpected.") from exc
 
     return (content or "").strip()
+
+
+async def stream_llm(prompt: str) -> AsyncIterator[str]:
+    """Yields content deltas from a streaming chat completion.
+
+    Closing the generator (e.g. when the client disconnects) drops the upstream
+    connection, and llama.cpp stops generating.
+    """
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+    payload = _chat_payload(prompt, stream=True)
+
+    async with llm_pool.stream("POST", "/v1/chat/completions", json=payload, headers=headers) as response:
+        if response.status_code >= 400:
+            raise HTTPException(status_code=502, detail=f"LLM error: {response.status_code}")
+
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            try:
+                delta = json.loads(data)["choices"][0].get("delta") or {}
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as exc:
+                raise HTTPException(status_code=502, detail="LLM stream format unexpected.") from exc
+            content = delta.get("content")
+            if content:
+                yield content
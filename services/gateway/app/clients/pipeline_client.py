@@ -1,9 +1,8 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-import httpx
 from fastapi import HTTPException, UploadFile
 
-from app.core.config import settings
+from app.clients.http_pool import pipeline_pool
 from app.services.pipeline_normalizer import normalize_pipeline_payload
 
 
@@ -11,16 +10,19 @@ async def call_pipeline(image: UploadFile) -> Dict[str, Any]:
     if image is None or not image.filename:
         raise HTTPException(status_code=400, detail="Image file is required.")
 
+    return await call_pipeline_bytes(image.filename, await image.read(), image.content_type)
+
+
+async def call_pipeline_bytes(filename: str, content: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
     files = {
         "image": (
-            image.filename,
-            await image.read(),
-            image.content_type or "application/octet-stream",
+            filename,
+            content,
+            content_type or "application/octet-stream",
         )
     }
 
-    async with httpx.AsyncClient(timeout=settings.http_timeout) as client:
-        response = await client.post(f"{settings.pipeline_url}/api/v1/convert", files=files)
+    response = await pipeline_pool.post("/api/v1/convert", files=files)
 
     if response.status_code >= 400:
         raise HTTPException(status_code=502, detail=f"Pipeline error: {response.status_code}")
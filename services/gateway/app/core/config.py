@@ -14,6 +14,24 @@ class Settings:
     llm_temperature: float = float(os.getenv("LLM_TEMPERATURE", "0.2"))
     llm_max_tokens: int = int(os.getenv("LLM_MAX_TOKENS", "4096"))
     http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "60"))
+    http_connect_timeout: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    http_keepalive_expiry: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+    llm_max_keepalive: int = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+    llm_read_timeout: float = float(os.getenv("LLM_READ_TIMEOUT", os.getenv("HTTP_TIMEOUT", "60")))
+    llm_pool_timeout: float = float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+    llm_http2: bool = os.getenv("LLM_HTTP2", "0") == "1"
+    pipeline_max_connections: int = int(os.getenv("PIPELINE_MAX_CONNECTIONS", "8"))
+    pipeline_max_keepalive: int = int(os.getenv("PIPELINE_MAX_KEEPALIVE", "8"))
+    pipeline_read_timeout: float = float(os.getenv("PIPELINE_READ_TIMEOUT", os.getenv("HTTP_TIMEOUT", "60")))
+    pipeline_pool_timeout: float = float(os.getenv("PIPELINE_POOL_TIMEOUT", "30"))
+    pipeline_http2: bool = os.getenv("PIPELINE_HTTP2", "0") == "1"
+    job_db_path: str = os.getenv("JOB_DB_PATH", "/tmp/gateway-jobs.sqlite3")
+    job_ttl_seconds: float = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+    job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+    job_queue_size: int = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+    job_retry_after: int = int(os.getenv("JOB_RETRY_AFTER", "5"))
+    job_cleanup_interval: float = float(os.getenv("JOB_CLEANUP_INTERVAL", "60"))
     prompt_bpmn_to_text: str = os.getenv(
         "PROMPT_BPMN_TO_TEXT",
         "You are given BPMN extraction JSON. It may be noisy or incomplete. "
@@ -1,3 +1,11 @@
+import json
+from typing import Any, Dict, Tuple
+
+
+def sse_event(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
 def extract_code_block(text: str) -> str:
     if "```" not in text:
         return text.strip()
@@ -12,3 +20,55 @@ def extract_code_block(text: str) -> str:
         lines = lines[1:]
 
     return "\n".join(lines).strip()
+
+
+def _hold_back(text: str) -> str:
+    # Trailing backticks may be the start of a fence and trailing whitespace may be stripped later
+    return text.rstrip("`").rstrip()
+
+
+class CodeBlockStream:
+    """Applies extract_code_block to text that arrives in chunks.
+
+    feed() returns (reset, text): text extends what was emitted so far, or, when
+    reset is True, replaces it (plain text was streamed and a fence showed up
+    later). Once finish() is called the emitted text equals
+    extract_code_block(full_text).
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._emitted = ""
+
+    def _stable(self) -> str:
+        start = self.text.find("```")
+        if start == -1:
+            return _hold_back(self.text).lstrip()
+
+        rest = self.text[start + 3:]
+        if "```" in rest:
+            # The first block is closed; nothing after it can change the result
+            return extract_code_block(self.text)
+        if not rest or rest.splitlines()[0] == rest:
+            # The fence line is incomplete, so it is not yet known whether it names the language
+            return ""
+
+        lines = rest.splitlines()
+        if lines[0].strip().lower().startswith("mermaid"):
+            lines = lines[1:]
+        return _hold_back("\n".join(lines)).lstrip()
+
+    def _advance(self, visible: str) -> Tuple[bool, str]:
+        if visible.startswith(self._emitted):
+            delta = visible[len(self._emitted):]
+            self._emitted = visible
+            return False, delta
+        self._emitted = visible
+        return True, visible
+
+    def feed(self, chunk: str) -> Tuple[bool, str]:
+        self.text += chunk
+        return self._advance(self._stable())
+
+    def finish(self) -> Tuple[bool, str]:
+        return self._advance(extract_code_block(self.text))
@@ -1,20 +1,50 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.jobs import router as jobs_router
 from app.api.routes import router
+from app.clients.http_pool import close_pools, open_pools
+from app.core.config import settings
+from app.services.job_queue import JobManager
+from app.services.job_store import JobStore
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    open_pools()
+    store = JobStore(settings.job_db_path, settings.job_ttl_seconds)
+    job_manager = JobManager(
+        store,
+        workers=settings.job_workers,
+        queue_size=settings.job_queue_size,
+        cleanup_interval=settings.job_cleanup_interval,
+        default_retry_after=settings.job_retry_after,
+    )
+    await job_manager.start()
+    app.state.job_manager = job_manager
+    try:
+        yield
+    finally:
+        await job_manager.stop()
+        store.close()
+        await close_pools()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="BPMN Gateway", version="1.0.0")
+    app = FastAPI(title="BPMN Gateway", version="1.0.0", lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Retry-After"],
     )
 
     app.include_router(router)
+    app.include_router(jobs_router)
 
     return app
 
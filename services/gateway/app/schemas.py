@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel
 
@@ -18,3 +18,38 @@ class TextToDiagramResponse(BaseModel):
 
 class ErrorResponse(BaseModel):
     error: str
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    result_url: str
+    events_url: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: float
+    error: Optional[str] = None
+
+
+class JobStatsResponse(BaseModel):
+    queue_depth: int
+    queue_capacity: int
+    workers: int
+    workers_busy: int
+    submitted: int
+    rejected: int
+    succeeded: int
+    failed: int
+    wait_ms_avg: float
+    wait_ms_p95: float
+    run_ms_avg: float
+    retry_after_s: int
+    stored: Dict[str, int]
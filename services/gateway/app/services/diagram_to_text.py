@@ -0,0 +1,18 @@
+import json
+from typing import Any, Dict, Optional
+
+from app.clients.llm_client import call_llm
+from app.clients.pipeline_client import call_pipeline_bytes
+from app.core.config import settings
+
+
+def build_description_prompt(pipeline_payload: Dict[str, Any]) -> str:
+    prompt_payload = json.dumps(pipeline_payload, ensure_ascii=False)
+    # Replace only the explicit placeholder to avoid KeyError from other braces in the template.
+    return settings.prompt_bpmn_to_text.replace("{payload}", prompt_payload)
+
+
+async def run_diagram_to_text(filename: str, content: bytes, content_type: Optional[str] = None) -> Dict[str, Any]:
+    pipeline_payload = await call_pipeline_bytes(filename, content, content_type)
+    description = await call_llm(build_description_prompt(pipeline_payload))
+    return {"description": description, "pipeline": pipeline_payload}
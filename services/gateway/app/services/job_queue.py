@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from fastapi import HTTPException
+
+from app.services.job_store import FAILED, RUNNING, SUCCEEDED, Job, JobStore
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+class QueueFullError(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Job queue is full.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _QueuedJob:
+    job_id: str
+    handler: JobHandler
+    args: tuple
+    enqueued_at: float
+
+
+class JobManager:
+    """Bounded queue of background jobs with a fixed number of workers.
+
+    Submissions beyond queue_size are rejected instead of queued, so callers can
+    answer 429 with a Retry-After estimate from recent run times.
+    """
+
+    def __init__(self, store: JobStore, workers: int, queue_size: int, cleanup_interval: float,
+                 default_retry_after: int):
+        self.store = store
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.cleanup_interval = cleanup_interval
+        self.default_retry_after = default_retry_after
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._busy = 0
+        self._wait_times: Deque[float] = deque(maxlen=200)
+        self._run_times: Deque[float] = deque(maxlen=200)
+        self._counters = {"submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0}
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        interrupted = await asyncio.to_thread(self.store.fail_unfinished, "Gateway restarted before the job finished.")
+        if interrupted:
+            logger.warning("Marked %d unfinished jobs as failed after restart", interrupted)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, handler: JobHandler, *args: Any) -> Job:
+        if self._queue.full():
+            self._counters["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+
+        job = await asyncio.to_thread(self.store.create, kind)
+        try:
+            self._queue.put_nowait(_QueuedJob(job.id, handler, args, time.monotonic()))
+        except asyncio.QueueFull:
+            # Another submission took the last slot while the record was being written
+            self._counters["rejected"] += 1
+            await asyncio.to_thread(self.store.fail, job.id, "Job queue is full.", 429)
+            raise QueueFullError(self.retry_after())
+        self._counters["submitted"] += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        return updates
+
+    def unsubscribe(self, job_id: str, updates: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is None:
+            return
+        subscribers.discard(updates)
+        if not subscribers:
+            del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, status: str) -> None:
+        for updates in self._subscribers.get(job_id, ()):
+            updates.put_nowait(status)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up, from recent run times."""
+        if not self._run_times:
+            return self.default_retry_after
+        average_run = sum(self._run_times) / len(self._run_times)
+        backlog = self._queue.qsize() if self._queue is not None else 0
+        estimate = average_run * max(1, backlog) / self.workers
+        return max(1, min(300, math.ceil(estimate)))
+
+    async def _worker(self) -> None:
+        while True:
+            queued = await self._queue.get()
+            started = time.monotonic()
+            self._wait_times.append(started - queued.enqueued_at)
+            self._busy += 1
+            try:
+                await asyncio.to_thread(self.store.mark_running, queued.job_id)
+                self._publish(queued.job_id, RUNNING)
+                try:
+                    result = await queued.handler(*queued.args)
+                except HTTPException as exc:
+                    await self._fail(queued.job_id, str(exc.detail), exc.status_code)
+                except asyncio.CancelledError:
+                    await asyncio.shield(self._fail(queued.job_id, "Gateway is shutting down.", 503))
+                    raise
+                except Exception as exc:
+                    logger.exception("Job %s failed", queued.job_id)
+                    await self._fail(queued.job_id, str(exc) or exc.__class__.__name__, 500)
+                else:
+                    await asyncio.to_thread(self.store.complete, queued.job_id, result)
+                    self._counters["succeeded"] += 1
+                    self._publish(queued.job_id, SUCCEEDED)
+            finally:
+                self._run_times.append(time.monotonic() - started)
+                self._busy -= 1
+                self._queue.task_done()
+
+    async def _fail(self, job_id: str, error: str, status_code: int) -> None:
+        await asyncio.to_thread(self.store.fail, job_id, error, status_code)
+        self._counters["failed"] += 1
+        self._publish(job_id, FAILED)
+
+    async def _cleanup(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            try:
+                removed = await asyncio.to_thread(self.store.purge_expired)
+            except Exception:
+                logger.exception("Job store cleanup failed")
+                continue
+            if removed:
+                logger.info("Purged %d expired jobs", removed)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._wait_times)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "workers": self.workers,
+            "workers_busy": self._busy,
+            **self._counters,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+            "run_ms_avg": round(1000 * sum(self._run_times) / len(self._run_times), 1) if self._run_times else 0.0,
+            "retry_after_s": self.retry_after(),
+        }
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATUSES = frozenset({SUCCEEDED, FAILED})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    error_status INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+class JobStore:
+    """SQLite-backed job records; every row expires ttl seconds after its last update."""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _execute(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _expiry(self, now: float) -> float:
+        return now + self.ttl_seconds
+
+    def create(self, kind: str) -> Job:
+        now = time.time()
+        job = Job(id=uuid.uuid4().hex, kind=kind, status=PENDING, created_at=now, expires_at=self._expiry(now))
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (job.id, job.kind, job.status, job.created_at, job.expires_at),
+        )
+        return job
+
+    def mark_running(self, job_id: str) -> None:
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, started_at = ?, expires_at = ? WHERE id = ?",
+            (RUNNING, now, self._expiry(now), job_id),
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?, result = ? WHERE id = ?",
+            (SUCCEEDED, now, self._expiry(now), json.dumps(result, ensure_ascii=False), job_id),
+        )
+
+    def fail(self, job_id: str, error: str, error_status: int = 500) -> None:
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?, error = ?, error_status = ? WHERE id = ?",
+            (FAILED, now, self._expiry(now), error, error_status, job_id),
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        rows = self._query("SELECT * FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time()))
+        if not rows:
+            return None
+        row = rows[0]
+        return Job(
+            id=row["id"],
+            kind=row["kind"],
+            status=row["status"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            expires_at=row["expires_at"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            error_status=row["error_status"],
+        )
+
+    def fail_unfinished(self, error: str) -> int:
+        """Marks jobs left pending/running by a previous process as failed."""
+        now = time.time()
+        return self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, expires_at = ?, error = ?, error_status = ? "
+            "WHERE status IN (?, ?)",
+            (FAILED, now, self._expiry(now), error, 503, PENDING, RUNNING),
+        )
+
+    def purge_expired(self) -> int:
+        return self._execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._query(
+            "SELECT status, COUNT(*) AS total FROM jobs WHERE expires_at > ? GROUP BY status", (time.time(),)
+        )
+        return {row["status"]: row["total"] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,328 @@
+"""Open-loop load generator for the gateway.
+
+Requests are sent on a fixed arrival schedule (Poisson or constant rate) no
+matter how slowly the gateway answers, and latency is measured from the
+scheduled send time, so a saturated gateway shows up as growing tail latency
+instead of silently lowering the offered load.
+
+Usage (from services/gateway):
+    # against a running gateway
+    python -m loadtest.load --url http://localhost:7000 --rate 20 --duration 60
+    # start stubs + gateway locally, then load them; unknown flags go to loadtest.stubs
+    python -m loadtest.load --spawn --gateway-workers 2 --rate 50 --llm-ttft fixed:0.3
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ENDPOINTS = {
+    "diagram-to-text": "/api/v1/diagram-to-text",
+    "text-to-diagram": "/api/v1/text-to-diagram",
+}
+
+# 1x1 PNG; the stub pipeline does not decode the upload
+DEFAULT_IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+DEFAULT_DESCRIPTION = (
+    "The customer submits an order. The order is checked; valid orders are shipped, "
+    "invalid ones are rejected and the customer is notified."
+)
+
+
+@dataclass
+class EndpointStats:
+    sent: int = 0
+    ok: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+    ttft_ms: List[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition(":")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def _request_kwargs(endpoint: str, image: bytes, description: str) -> Dict:
+    if endpoint == "diagram-to-text":
+        return {"files": {"image": ("diagram.png", image, "image/png")}}
+    return {"json": {"description": description}}
+
+
+async def _send(client: httpx.AsyncClient, endpoint: str, image: bytes, description: str) -> int:
+    response = await client.post(ENDPOINTS[endpoint], **_request_kwargs(endpoint, image, description))
+    return response.status_code
+
+
+async def _send_stream(client: httpx.AsyncClient, endpoint: str, image: bytes, description: str,
+                       scheduled: float) -> Tuple[str, Optional[float]]:
+    """Reads an SSE endpoint to the end; returns the outcome and time to the first text delta."""
+    ttft_ms = None
+    outcome = "ok"
+    path = ENDPOINTS[endpoint] + "/stream"
+    async with client.stream("POST", path, **_request_kwargs(endpoint, image, description)) as response:
+        if response.status_code >= 400:
+            return str(response.status_code), None
+        async for line in response.aiter_lines():
+            if line == "event: delta" and ttft_ms is None:
+                ttft_ms = (time.perf_counter() - scheduled) * 1000
+            elif line == "event: error":
+                outcome = "error_event"
+    return outcome, ttft_ms
+
+
+async def run_load(url: str, rate: float, duration: float, mix: List[Tuple[str, float]], arrival: str,
+                   warmup: float, timeout: float, drain_timeout: float, max_connections: int,
+                   image: bytes, description: str, seed: Optional[int] = None, stream: bool = False) -> Dict:
+    rnd = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in names}
+    lateness_ms: List[float] = []
+    pending = set()
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+
+        async def one(endpoint: str, scheduled: float, measured: bool) -> None:
+            lateness_ms.append((time.perf_counter() - scheduled) * 1000)
+            ttft_ms = None
+            try:
+                if stream:
+                    outcome, ttft_ms = await _send_stream(client, endpoint, image, description, scheduled)
+                else:
+                    status = await _send(client, endpoint, image, description)
+                    outcome = "ok" if status < 400 else str(status)
+            except httpx.TimeoutException:
+                outcome = "timeout"
+            except httpx.HTTPError as exc:
+                outcome = exc.__class__.__name__
+            if not measured:
+                return
+            endpoint_stats = stats[endpoint]
+            endpoint_stats.sent += 1
+            if outcome == "ok":
+                endpoint_stats.ok += 1
+                endpoint_stats.latencies_ms.append((time.perf_counter() - scheduled) * 1000)
+                if ttft_ms is not None:
+                    endpoint_stats.ttft_ms.append(ttft_ms)
+            else:
+                endpoint_stats.errors[outcome] += 1
+
+        start = time.perf_counter()
+        next_at = start
+        end = start + warmup + duration
+        while next_at < end:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = rnd.choices(names, weights)[0]
+            task = asyncio.create_task(one(endpoint, next_at, next_at >= start + warmup))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            next_at += rnd.expovariate(rate) if arrival == "poisson" else 1 / rate
+
+        # Requests still running after the drain timeout count as unfinished
+        if pending:
+            _, unfinished = await asyncio.wait(set(pending), timeout=drain_timeout)
+            for task in unfinished:
+                task.cancel()
+            unfinished_count = len(unfinished)
+        else:
+            unfinished_count = 0
+
+    return build_report(stats, duration, rate, lateness_ms, unfinished_count, stream)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "max": round(values[-1], 1) if values else 0.0,
+    }
+
+
+def build_report(stats: Dict[str, EndpointStats], duration: float, rate: float,
+                 lateness_ms: List[float], unfinished: int, stream: bool = False) -> Dict:
+    def summary(items: List[EndpointStats]) -> Dict:
+        sent = sum(item.sent for item in items)
+        ok = sum(item.ok for item in items)
+        errors: Counter = Counter()
+        for item in items:
+            errors.update(item.errors)
+        row = {
+            "sent": sent,
+            "ok": ok,
+            "errors": dict(errors),
+            "error_rate": round((sent - ok) / sent, 4) if sent else 0.0,
+            "rps_offered": round(sent / duration, 2),
+            "rps_ok": round(ok / duration, 2),
+            "latency_ms": _percentiles([latency for item in items for latency in item.latencies_ms]),
+        }
+        if stream:
+            # Time from the scheduled send to the first streamed text delta
+            row["ttft_ms"] = _percentiles([ttft for item in items for ttft in item.ttft_ms])
+        return row
+
+    lateness = sorted(lateness_ms)
+    return {
+        "target_rps": rate,
+        "stream": stream,
+        "duration_s": duration,
+        "unfinished": unfinished,
+        # Large values mean the generator itself could not keep the schedule
+        "send_lateness_ms_p99": round(percentile(lateness, 99), 1),
+        "total": summary(list(stats.values())),
+        "endpoints": {name: summary([item]) for name, item in stats.items()},
+    }
+
+
+def print_report(report: Dict) -> None:
+    print(f"target {report['target_rps']} rps for {report['duration_s']} s, "
+          f"unfinished {report['unfinished']}, send lateness p99 {report['send_lateness_ms_p99']} ms")
+    print(f"{'endpoint':>16} {'sent':>6} {'rps ok':>7} {'err %':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  errors")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, row in rows:
+        latency = row["latency_ms"]
+        print(f"{name:>16} {row['sent']:>6} {row['rps_ok']:>7} {row['error_rate'] * 100:>6.1f} "
+              f"{latency['p50']:>8} {latency['p95']:>8} {latency['p99']:>8} {latency['max']:>8}  "
+              f"{json.dumps(row['errors']) if row['errors'] else ''}")
+    if report["stream"]:
+        print(f"{'ttft':>16} {'':>6} {'':>7} {'':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+        for name, row in rows:
+            ttft = row["ttft_ms"]
+            print(f"{name:>16} {'':>6} {'':>7} {'':>6} {ttft['p50']:>8} {ttft['p95']:>8} {ttft['p99']:>8} {ttft['max']:>8}")
+
+
+def _wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become healthy in {timeout} s")
+
+
+def spawn(stub_port: int, gateway_port: int, gateway_workers: int, stub_args: List[str],
+          job_db_dir: str) -> List[subprocess.Popen]:
+    """Starts the stubs and a gateway wired to them as child processes."""
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    stubs = subprocess.Popen([sys.executable, "-m", "loadtest.stubs", "--port", str(stub_port), *stub_args])
+    env = {
+        **os.environ,
+        "PIPELINE_URL": stub_url,
+        "LLM_URL": stub_url,
+        "JOB_DB_PATH": os.path.join(job_db_dir, "jobs.sqlite3"),
+    }
+    gateway = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(gateway_port),
+         "--workers", str(gateway_workers), "--log-level", "warning"],
+        env=env,
+    )
+    processes = [stubs, gateway]
+    try:
+        _wait_healthy(stub_url, stubs)
+        _wait_healthy(f"http://127.0.0.1:{gateway_port}", gateway)
+    except Exception:
+        for process in processes:
+            process.terminate()
+        raise
+    return processes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:7000", help="gateway base URL")
+    parser.add_argument("--rate", type=float, default=10, help="offered load, requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="measured period, seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured period before it, seconds")
+    parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--mix", type=parse_mix, default="diagram-to-text:1,text-to-diagram:1",
+                        help="endpoint weights, e.g. diagram-to-text:3,text-to-diagram:1")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout, seconds")
+    parser.add_argument("--drain-timeout", type=float, default=60,
+                        help="how long to wait for in-flight requests after the schedule ends")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--image", help="image to upload to diagram-to-text (default: 1x1 PNG)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--stream", action="store_true",
+                        help="use the SSE /stream endpoints and report time to first token")
+    parser.add_argument("--output", metavar="PATH", help="write the JSON report to a file")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start loadtest.stubs and a gateway pointed at them before loading")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--gateway-port", type=int, default=7100)
+    parser.add_argument("--gateway-workers", type=int, default=1)
+    args, stub_args = parser.parse_known_args()
+    if stub_args and not args.spawn:
+        parser.error(f"unrecognized arguments: {' '.join(stub_args)}")
+
+    image = DEFAULT_IMAGE
+    if args.image:
+        with open(args.image, "rb") as image_file:
+            image = image_file.read()
+
+    processes: List[subprocess.Popen] = []
+    with tempfile.TemporaryDirectory() as job_db_dir:
+        url = args.url
+        if args.spawn:
+            processes = spawn(args.stub_port, args.gateway_port, args.gateway_workers, stub_args, job_db_dir)
+            url = f"http://127.0.0.1:{args.gateway_port}"
+        try:
+            report = asyncio.run(run_load(
+                url, args.rate, args.duration, args.mix, args.arrival, args.warmup, args.timeout,
+                args.drain_timeout, args.max_connections, image, DEFAULT_DESCRIPTION, args.seed, args.stream,
+            ))
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+    report["config"] = {
+        "url": url,
+        "arrival": args.arrival,
+        "mix": dict(args.mix),
+        "gateway_workers": args.gateway_workers if args.spawn else None,
+        "stub_args": stub_args,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Local stand-ins for the LLM and pipeline services used by the load test.
+
+Serves the two contracts the gateway depends on from one process:
+
+- POST /v1/chat/completions (llama.cpp / OpenAI format, with "stream": true SSE)
+- POST /api/v1/convert (pipeline multipart upload, returns extraction JSON)
+
+Usage:
+    python -m loadtest.stubs --port 8100 --llm-ttft lognormal:0.4,0.3 --llm-tokens 200
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+import uvicorn
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+
+Distribution = Callable[[], float]
+
+PIPELINE_PAYLOAD: Dict = {
+    "participants": [{"id": "Participant_1", "type": "participant", "name": "Customer"}],
+    "elements": [
+        {"id": "StartEvent_1", "type": "startEvent", "name": "Order received"},
+        {"id": "Task_1", "type": "task", "name": "Check order"},
+        {"id": "Gateway_1", "type": "exclusiveGateway", "name": "Valid?"},
+        {"id": "Task_2", "type": "task", "name": "Ship goods"},
+        {"id": "EndEvent_1", "type": "endEvent", "name": "Done"},
+    ],
+    "flows": [
+        {"id": "Flow_1", "type": "sequenceFlow", "source": "StartEvent_1", "target": "Task_1"},
+        {"id": "Flow_2", "type": "sequenceFlow", "source": "Task_1", "target": "Gateway_1"},
+        {"id": "Flow_3", "type": "sequenceFlow", "source": "Gateway_1", "target": "Task_2"},
+        {"id": "Flow_4", "type": "sequenceFlow", "source": "Task_2", "target": "EndEvent_1"},
+    ],
+}
+
+MERMAID_REPLY = "```mermaid\nflowchart TD\n  A[Order received] --> B[Check order]\n  B --> C{Valid?}\n  C --> D[Ship goods]\n```"
+DESCRIPTION_WORDS = ("The", "customer", "submits", "an", "order", "which", "is", "checked", "and", "shipped.")
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """Parses "fixed:S", "uniform:A,B", "normal:MEAN,STD", "lognormal:MEDIAN,SIGMA" or "exp:MEAN" (seconds)."""
+    kind, _, raw = spec.partition(":")
+    try:
+        params = [float(value) for value in raw.split(",")] if raw else []
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Invalid distribution parameters: {spec}") from exc
+
+    if kind == "fixed" and len(params) == 1:
+        return lambda: params[0]
+    if kind == "uniform" and len(params) == 2:
+        return lambda: random.uniform(params[0], params[1])
+    if kind == "normal" and len(params) == 2:
+        return lambda: max(0.0, random.gauss(params[0], params[1]))
+    if kind == "lognormal" and len(params) == 2:
+        mu = math.log(params[0]) if params[0] > 0 else 0.0
+        return lambda: random.lognormvariate(mu, params[1])
+    if kind == "exp" and len(params) == 1:
+        return lambda: random.expovariate(1 / params[0]) if params[0] > 0 else 0.0
+    raise argparse.ArgumentTypeError(f"Unknown distribution: {spec}")
+
+
+@dataclass
+class StubConfig:
+    pipeline_latency: Distribution = field(default_factory=lambda: parse_distribution("lognormal:0.8,0.4"))
+    llm_ttft: Distribution = field(default_factory=lambda: parse_distribution("lognormal:0.4,0.3"))
+    llm_token_interval: Distribution = field(default_factory=lambda: parse_distribution("fixed:0.02"))
+    llm_tokens: int = 200
+    pipeline_error_rate: float = 0.0
+    llm_error_rate: float = 0.0
+
+
+def _reply_tokens(prompt: str, count: int) -> list:
+    if "Mermaid" in prompt:
+        # Keep the fenced block intact so extract_code_block sees the real shape
+        return [line + "\n" for line in MERMAID_REPLY.splitlines()]
+    return [DESCRIPTION_WORDS[i % len(DESCRIPTION_WORDS)] + " " for i in range(max(1, count))]
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="Gateway load-test stubs")
+    app.state.config = config
+    app.state.counters = {"convert": 0, "chat": 0, "errors": 0, "streams_cancelled": 0}
+
+    @app.get("/health")
+    async def health() -> Dict[str, object]:
+        return {"status": "ok", **app.state.counters}
+
+    @app.post("/api/v1/convert")
+    async def convert(image: UploadFile = File(...)) -> Dict:
+        await image.read()
+        app.state.counters["convert"] += 1
+        started = time.perf_counter()
+        await asyncio.sleep(config.pipeline_latency())
+        if random.random() < config.pipeline_error_rate:
+            app.state.counters["errors"] += 1
+            raise HTTPException(status_code=500, detail="Injected pipeline error.")
+        return {**PIPELINE_PAYLOAD, "processing_time_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.counters["chat"] += 1
+        prompt = "".join(message.get("content", "") for message in body.get("messages", []))
+        tokens = _reply_tokens(prompt, config.llm_tokens)
+
+        await asyncio.sleep(config.llm_ttft())
+        if random.random() < config.llm_error_rate:
+            app.state.counters["errors"] += 1
+            raise HTTPException(status_code=500, detail="Injected LLM error.")
+
+        if body.get("stream"):
+            async def events():
+                for token in tokens:
+                    if await request.is_disconnected():
+                        # The gateway dropped the connection: generation stops, like llama.cpp
+                        app.state.counters["streams_cancelled"] += 1
+                        return
+                    chunk = {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(config.llm_token_interval())
+                yield 'data: {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}\n\n'
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        # Non-streaming clients still wait for the whole generation
+        await asyncio.sleep(sum(config.llm_token_interval() for _ in tokens))
+        return {
+            "object": "chat.completion",
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": {"completion_tokens": len(tokens)},
+        }
+
+    return app
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--pipeline-latency", type=parse_distribution, default="lognormal:0.8,0.4",
+                        help="pipeline /api/v1/convert latency, seconds")
+    parser.add_argument("--llm-ttft", type=parse_distribution, default="lognormal:0.4,0.3",
+                        help="LLM time to first token, seconds")
+    parser.add_argument("--llm-token-interval", type=parse_distribution, default="fixed:0.02",
+                        help="LLM delay between streamed tokens, seconds")
+    parser.add_argument("--llm-tokens", type=int, default=200, help="tokens per LLM reply")
+    parser.add_argument("--pipeline-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        pipeline_latency=args.pipeline_latency,
+        llm_ttft=args.llm_ttft,
+        llm_token_interval=args.llm_token_interval,
+        llm_tokens=args.llm_tokens,
+        pipeline_error_rate=args.pipeline_error_rate,
+        llm_error_rate=args.llm_error_rate,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import json
+import time
+from typing import List, Optional
+
+from fastapi import UploadFile, File, Header, Query
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+
+from api.resources.convert_resource import (
+    ALLOWED_EXTENSIONS,
+    OUTPUT_FORMATS,
+    _elapsed_ms,
+    lookup_cache,
+    render_bpmn,
+    run_pipeline,
+    store_result,
+)
+from api.services import (
+    batch_service as bs,
+    storage_service as ss,
+)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def _convert_item(data: bytes, format: str, x_cache_bypass: Optional[str]) -> dict:
+    """Конвертирует одно изображение пакета; результат — поля строки NDJSON."""
+    item_start = time.perf_counter()
+
+    decoded_img = await run_in_threadpool(ss.decode_image, data)
+    if decoded_img is None:
+        raise bs.BatchItemError("Не удалось декодировать изображение")
+
+    cache_key, cache_status, cached = lookup_cache(
+        decoded_img, format, x_cache_bypass)
+    if cached is not None:
+        result = cached.decode() if format == "bpmn" else json.loads(cached)
+    else:
+        diagram = await run_pipeline(decoded_img, format, cache_key)
+        if format == "bpmn":
+            rendered = await render_bpmn(diagram)
+            store_result(cache_key, rendered)
+            result = rendered.decode()
+        else:
+            result = diagram
+            store_result(cache_key, result)
+
+    return {
+        "status": "ok",
+        "cache": cache_status,
+        "result": result,
+        "processing_time_ms": _elapsed_ms(item_start),
+    }
+
+
+async def convert_batch(
+    images: List[UploadFile] = File(...),
+    x_cache_bypass: Optional[str] = Header(None),
+    format: str = Query("json"),
+):
+    """Пакетная конвертация: список изображений и/или zip-архивов в multipart.
+
+    Ответ — NDJSON, по строке на изображение в порядке готовности:
+    {"index", "filename", "status": "ok", "cache", "result", "processing_time_ms"}
+    или {"index", "filename", "status": "error", "error"}. Ошибка одного
+    изображения не прерывает пакет.
+    """
+    if format not in OUTPUT_FORMATS:
+        return JSONResponse(
+            content={
+                "error": f"Недопустимый формат ответа. Разрешены: {', '.join(OUTPUT_FORMATS)}"
+            },
+            status_code=400
+        )
+
+    async def convert_item(name: str, data: bytes) -> dict:
+        return await _convert_item(data, format, x_cache_bypass)
+
+    return StreamingResponse(
+        bs.stream_batch(
+            bs.iter_uploads(images, ALLOWED_EXTENSIONS),
+            convert_item,
+        ),
+        status_code=200,
+        media_type=NDJSON_MEDIA_TYPE,
+    )
@@ -1,44 +1,204 @@
 import time
 import asyncio
-import os
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from fastapi import UploadFile, File
-from starlette.responses import PlainTextResponse, JSONResponse
-# DEPRECATED: Импорт DiagramFactory оставлен для возможности генерации BPMN XML
-# from bpmn.element_factories import DiagramFactory
+from typing import Optional, Tuple, Union
+from fastapi import UploadFile, File, Header, Query
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import PlainTextResponse, JSONResponse, Response, StreamingResponse
+from bpmn.bpmn_elements import Diagram
+from bpmn.element_factories import DiagramFactory
 from api.services import (
     predict_service as ps,
     ocr_service as ocr,
     convert_service as cs,
     storage_service as ss,
+    telemetry_service as ts,
+    worker_service as ws,
 )
-from commons.utils import sample_bpmn, here
+from api.services.cache_service import result_cache
+from api.services.model_service import model_manager
+from commons.id_allocator import ID_MODE, id_scope
+from commons.utils import sample_bpmn
 
 # Настройка логгера
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Thread pool для параллельного выполнения моделей
-executor = ThreadPoolExecutor(max_workers=3)
+# Исполнитель для моделей и OCR: пул потоков или процессов-воркеров (INFERENCE_MODE).
+# Модели загружает model_manager в фоне после старта сервера (start_models)
+executor = ws.create_executor()
 
 # Допустимые форматы изображений
 ALLOWED_EXTENSIONS = {'.png', '.jpg',
                       '.jpeg', '.bmp', '.tiff', '.tif', '.webp'}
 
+# Форматы ответа: json — описание для LLM, bpmn — BPMN XML для редакторов
+OUTPUT_FORMATS = ("json", "bpmn")
+BPMN_MEDIA_TYPE = "application/xml"
+
 
 def _elapsed_ms(start_time: float) -> float:
     """Возвращает прошедшее время в миллисекундах от переданного момента."""
     return round((time.perf_counter() - start_time) * 1000, 3)
 
 
-async def convert_image(image: UploadFile = File(...)):
-    """Обрабатывает POST-запрос на конвертацию изображения в структурированный JSON.
+def _json_response(payload: dict, request_start: float, cache_status: str) -> JSONResponse:
+    """Формирует успешный ответ с временем обработки и статусом кэша."""
+    with ts.stage("serialize"):
+        return JSONResponse(
+            content={
+                **payload,
+                "processing_time_ms": _elapsed_ms(request_start)
+            },
+            status_code=200,
+            headers={"X-Cache": cache_status}
+        )
+
+
+def _bpmn_response(content: bytes, request_start: float, cache_status: str) -> Response:
+    """Формирует ответ с BPMN XML, временем обработки и статусом кэша."""
+    return Response(
+        content=content,
+        status_code=200,
+        media_type=BPMN_MEDIA_TYPE,
+        headers={
+            "X-Cache": cache_status,
+            "X-Processing-Time-Ms": str(_elapsed_ms(request_start)),
+        }
+    )
+
+
+def lookup_cache(decoded_img, format: str = "json",
+                 x_cache_bypass: Optional[str] = None) -> Tuple[Optional[str], str, Optional[bytes]]:
+    """Проверяет кэш результатов: (ключ для сохранения, статус X-Cache, готовый ответ или None)."""
+    if not result_cache.enabled:
+        return None, "DISABLED", None
+    if x_cache_bypass in ("1", "true", "yes"):
+        result_cache.count_bypass()
+        return None, "BYPASS", None
+
+    with ts.stage("cache_lookup"):
+        cache_key = result_cache.make_key(decoded_img, variant=format)
+        cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cache_key, "HIT", cached
+    return cache_key, "MISS", None
+
+
+def store_result(cache_key: Optional[str], result: Union[dict, bytes]):
+    """Сохраняет JSON-описание или отрендеренный XML в кэш (если ключ выдан lookup_cache)."""
+    if cache_key is None:
+        return
+    if isinstance(result, dict):
+        result = json.dumps(result, ensure_ascii=False).encode()
+    result_cache.put(cache_key, result)
+
+
+async def render_bpmn(diagram: Diagram) -> bytes:
+    """Рендерит BPMN XML в пуле потоков, не занимая цикл событий и исполнитель моделей."""
+    with ts.stage("serialize"):
+        return await run_in_threadpool(lambda: b"".join(cs.stream_diagram(diagram)))
+
+
+async def run_pipeline(decoded_img, format: str = "json",
+                       cache_key: Optional[str] = None) -> Union[dict, Diagram]:
+    """Полный пайплайн для декодированного изображения: модели, OCR и сборка элементов.
+
+    Возвращает JSON-описание (format=json) или диаграмму для рендеринга в XML (format=bpmn).
+    """
+    with ts.stage("prepare"):
+        ocr_img, predict_img = ss.get_ocr_and_predict_images(decoded_img)
+
+    # Параллельный запуск всех моделей
+    # В режиме regions OCR выполняется после детекции, по областям подписей
+    regions_mode = ocr.OCR_MODE == "regions"
+    if regions_mode:
+        text_future = asyncio.sleep(0, result=[])
+    else:
+        text_future = ts.run_in_executor(
+            executor, "ocr", ocr.get_text_from_img, ocr_img
+        )
+
+    if ps.PREDICT_COMBINED:
+        predictions_future = ts.run_in_executor(
+            executor, "predict_combined", ps.predict_combined, predict_img, ocr_img
+        )
+        (obj_predictions, kp_predictions), text = await asyncio.gather(
+            predictions_future,
+            text_future
+        )
+    else:
+        obj_predictions_future = ts.run_in_executor(
+            executor, "predict_object", ps.predict_object, predict_img
+        )
+        kp_predictions_future = ts.run_in_executor(
+            executor, "predict_keypoint", ps.predict_keypoint, ocr_img
+        )
+
+        # Ожидаем завершения всех моделей
+        obj_predictions, kp_predictions, text = await asyncio.gather(
+            obj_predictions_future,
+            kp_predictions_future,
+            text_future
+        )
+
+    # Последовательная обработка результатов
+    # ID выдаются аллокатором запроса; в режиме seeded seed — хэш пикселей
+    # (ключ JSON-варианта), поэтому повторная обработка того же изображения
+    # даёт те же ID в JSON и в XML
+    id_seed = cache_key if format == "json" else None
+    if id_seed is None and ID_MODE == "seeded":
+        id_seed = result_cache.make_key(decoded_img)
+
+    with id_scope(seed=id_seed):
+        with ts.stage("convert"):
+            elements = cs.convert_object_predictions(obj_predictions)
+            flows = cs.convert_keypoint_prediction(kp_predictions)
+        with ts.stage("link_flows"):
+            cs.link_flows(flows, elements)
+        elements.extend(flows)
+        if regions_mode:
+            with ts.stage("plan_regions"):
+                regions = ocr.plan_regions(elements, ocr_img.shape)
+            region_texts = await ts.run_in_executor(
+                executor, "ocr_regions", ocr.get_text_from_regions, ocr_img, regions
+            )
+            with ts.stage("link_text"):
+                ocr.attach_region_text(regions, region_texts, elements)
+        else:
+            with ts.stage("link_text"):
+                ocr.link_text(text, elements)
+
+        with ts.stage("assemble"):
+            if format == "bpmn":
+                # BPMN XML по тем же элементам, что и JSON
+                return DiagramFactory.create_element(elements)
+            # Преобразуем в структурированный JSON для LLM
+            return cs.elements_to_json(elements)
+
+
+async def convert_image(
+    image: UploadFile = File(...),
+    x_cache_bypass: Optional[str] = Header(None),
+    format: str = Query("json"),
+):
+    """Обрабатывает POST-запрос на конвертацию изображения в структурированный JSON или BPMN XML.
 
     Пайплайн выполняется с параллельным запуском всех моделей.
-    Возвращает JSON с распознанными элементами диаграммы для последующей обработки LLM.
+    По умолчанию возвращает JSON с распознанными элементами диаграммы для последующей
+    обработки LLM, с format=bpmn — BPMN XML по тем же элементам.
+    Результаты кэшируются по хэшу пикселей; заголовок X-Cache-Bypass: 1 отключает кэш.
+    Длительности этапов возвращаются в заголовке Server-Timing.
     """
+    with ts.request_timings("convert") as timings:
+        response = await _convert_image(image, x_cache_bypass, format)
+        response.headers["Server-Timing"] = timings.server_timing()
+        timings.finish(response.status_code)
+        return response
+
 
+async def _convert_image(image: UploadFile, x_cache_bypass: Optional[str], format: str):
     request_start = time.perf_counter()
 
     try:
@@ -63,16 +223,23 @@ async def convert_image(image: UploadFile = File(...)):
                 status_code=400
             )
 
-        safe_filename = f"{int(time.time_ns())}.{file_ext}"
-        path = here(f"../../tmp/{safe_filename}")
-
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if format not in OUTPUT_FORMATS:
+            return JSONResponse(
+                content={
+                    "error": f"Недопустимый формат ответа. Разрешены: {', '.join(OUTPUT_FORMATS)}",
+                    "processing_time_ms": _elapsed_ms(request_start)
+                },
+                status_code=400
+            )
 
-        with open(path, 'wb+') as disk_file:
-            disk_file.write(await image.read())
-        ocr_img, predict_img = ss.get_ocr_and_predict_images(path)
+        upload_start = time.perf_counter()
+        data = await image.read()
+        ts.record_stage("upload", time.perf_counter() - upload_start)
+        with ts.stage("decode"):
+            decoded_img = ss.decode_image(data)
+        del data
 
-        if ocr_img is None or predict_img is None:
+        if decoded_img is None:
             return PlainTextResponse(
                 content=sample_bpmn,
                 status_code=200,
@@ -80,46 +247,32 @@ async def convert_image(image: UploadFile = File(...)):
                     "X-Processing-Time-Ms": str(_elapsed_ms(request_start))}
             )
 
-        # Параллельный запуск всех моделей
-        loop = asyncio.get_event_loop()
-
-        obj_predictions_future = loop.run_in_executor(
-            executor, ps.predict_object, predict_img
-        )
-        kp_predictions_future = loop.run_in_executor(
-            executor, ps.predict_keypoint, ocr_img
-        )
-        text_future = loop.run_in_executor(
-            executor, ocr.get_text_from_img, ocr_img
-        )
+        cache_key, cache_status, cached = lookup_cache(
+            decoded_img, format, x_cache_bypass)
+        if cached is not None:
+            if format == "bpmn":
+                return _bpmn_response(cached, request_start, cache_status)
+            return _json_response(json.loads(cached), request_start, cache_status)
 
-        # Ожидаем завершения всех моделей
-        obj_predictions, kp_predictions, text = await asyncio.gather(
-            obj_predictions_future,
-            kp_predictions_future,
-            text_future
-        )
+        result = await run_pipeline(decoded_img, format, cache_key)
 
-        # Последовательная обработка результатов
-        elements = cs.convert_object_predictions(obj_predictions)
-        flows = cs.convert_keypoint_prediction(kp_predictions)
-        cs.link_flows(flows, elements)
-        elements.extend(flows)
-        ocr.link_text(text, elements)
-
-        # Преобразуем в структурированный JSON для LLM
-        diagram_json = cs.elements_to_json(elements)
-        response_payload = {
-            **diagram_json,
-            "processing_time_ms": _elapsed_ms(request_start)
-        }
-
-        return JSONResponse(content=response_payload, status_code=200)
+        if format == "bpmn":
+            if cache_key is None:
+                return StreamingResponse(
+                    cs.stream_diagram(result),
+                    status_code=200,
+                    media_type=BPMN_MEDIA_TYPE,
+                    headers={
+                        "X-Cache": cache_status,
+                        "X-Processing-Time-Ms": str(_elapsed_ms(request_start)),
+                    }
+                )
+            rendered_bpmn_model = await render_bpmn(result)
+            store_result(cache_key, rendered_bpmn_model)
+            return _bpmn_response(rendered_bpmn_model, request_start, cache_status)
 
-        # DEPRECATED: Генерация BPMN XML - оставлено для справки
-        # bpmn_diagram = DiagramFactory.create_element(elements)
-        # rendered_bpmn_model = cs.render_diagram(bpmn_diagram)
-        # return PlainTextResponse(content=rendered_bpmn_model, status_code=200)
+        store_result(cache_key, result)
+        return _json_response(result, request_start, cache_status)
 
     except ValueError as e:
         return JSONResponse(
@@ -145,3 +298,16 @@ async def convert_image(image: UploadFile = File(...)):
             },
             status_code=500
         )
+
+
+def start_models():
+    """Запускает фоновую загрузку и прогрев моделей через исполнитель."""
+    tasks_per_model = ws.INFERENCE_WORKERS if ws.uses_worker_processes() else 1
+    if isinstance(executor, ws.InferenceWorkerPool):
+        executor.add_restart_callback(model_manager.restart)
+    model_manager.start(executor, tasks_per_model)
+
+
+def shutdown_executor():
+    """Останавливает исполнитель моделей при завершении сервера."""
+    executor.shutdown(wait=False)
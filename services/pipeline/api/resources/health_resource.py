@@ -0,0 +1,14 @@
+from starlette.responses import JSONResponse
+
+from api.services.model_service import model_manager
+
+
+def get_live():
+    """Liveness-проба: процесс отвечает на запросы."""
+    return JSONResponse(content={"status": "ok"}, status_code=200)
+
+
+def get_ready():
+    """Readiness-проба: 200, когда все модели загружены и прогреты, иначе 503."""
+    status = model_manager.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
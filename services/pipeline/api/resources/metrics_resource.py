@@ -1,48 +1,64 @@
 import os
 import platform
-import time
 import psutil
-from starlette.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.responses import JSONResponse, Response
 
-
-_process = psutil.Process(os.getpid())
+from api.services.cache_service import result_cache
+from api.services.sampler_service import METRICS_DISK_PATH, resource_sampler
 
 
 def get_metrics():
-    """Возвращает метрики использования ресурсов контейнера."""
-    psutil.cpu_percent(interval=None)
-    _process.cpu_percent(interval=None)
-    time.sleep(0.1)
-    cpu_percent = psutil.cpu_percent(interval=None)
-    cpu_count = psutil.cpu_count(logical=True) or 0
-
-    memory = psutil.virtual_memory()
-    process_memory = _process.memory_info()
-    process_cpu_percent = _process.cpu_percent(interval=None)
+    """Возвращает метрики использования ресурсов контейнера.
 
-    disk_path = os.getenv("METRICS_DISK_PATH", "/")
-    disk_usage = psutil.disk_usage(disk_path)
+    Значения берутся из фонового сэмплера: текущие показания, min/avg/max за
+    окно METRICS_WINDOW_SECONDS и лимиты cgroup. Запрос не ждёт замера CPU:
+    до первого показания сэмплера текущие значения равны null.
+    """
+    snapshot = resource_sampler.snapshot()
+    current = snapshot["current"]
+    disk_usage = psutil.disk_usage(METRICS_DISK_PATH)
+    memory_total = psutil.virtual_memory().total
 
     payload = {
         "system": {
             "platform": platform.system(),
-            "cpu_percent": cpu_percent,
-            "cpu_count": cpu_count,
-            "memory_total_bytes": memory.total,
-            "memory_used_bytes": memory.used,
-            "memory_available_bytes": memory.available,
-            "memory_percent": memory.percent,
+            "cpu_percent": current.get("cpu_percent"),
+            "cpu_count": psutil.cpu_count(logical=True) or 0,
+            "memory_total_bytes": memory_total,
+            "memory_used_bytes": current.get("memory_used_bytes"),
+            "memory_available_bytes": current.get("memory_available_bytes"),
+            "memory_percent": current.get("memory_percent"),
             "disk_total_bytes": disk_usage.total,
             "disk_used_bytes": disk_usage.used,
             "disk_free_bytes": disk_usage.free,
             "disk_percent": disk_usage.percent,
+            "disk_read_bytes_per_s": current.get("disk_read_bytes_per_s"),
+            "disk_write_bytes_per_s": current.get("disk_write_bytes_per_s"),
         },
         "process": {
-            "pid": _process.pid,
-            "cpu_percent": process_cpu_percent,
-            "memory_rss_bytes": process_memory.rss,
-            "memory_vms_bytes": process_memory.vms,
-        }
+            "pid": os.getpid(),
+            "cpu_percent": current.get("process_cpu_percent"),
+            "memory_rss_bytes": current.get("process_rss_bytes"),
+            "memory_vms_bytes": current.get("process_vms_bytes"),
+            "threads": current.get("process_threads"),
+        },
+        "cgroup": {
+            **snapshot["cgroup"],
+            "memory_usage_bytes": current.get("cgroup_memory_bytes"),
+            "throttled_percent": current.get("cgroup_throttled_percent"),
+            "nr_periods": current.get("cgroup_nr_periods"),
+            "nr_throttled": current.get("cgroup_nr_throttled"),
+            "throttled_usec": current.get("cgroup_throttled_usec"),
+        },
+        "window": snapshot["window"],
+        "sampled_at": current.get("timestamp"),
+        "convert_cache": result_cache.stats(),
     }
 
     return JSONResponse(content=payload, status_code=200)
+
+
+def get_prometheus_metrics():
+    """Возвращает гистограммы этапов и счётчики запросов в формате Prometheus."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
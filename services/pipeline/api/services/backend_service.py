@@ -0,0 +1,168 @@
+import logging
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import torch
+from detectron2.modeling.postprocessing import detector_postprocess
+
+from commons.utils import here
+
+logger = logging.getLogger(__name__)
+
+# eager — исходная модель PyTorch, int8 — динамическое INT8-квантование Linear-слоёв,
+# torchscript / torchscript-int8 — модели, заранее экспортированные export_models.py
+PREDICT_BACKEND = os.getenv("PREDICT_BACKEND", "eager")
+BACKENDS = ("eager", "int8", "torchscript", "torchscript-int8")
+
+MODELS_DIR = here("../../detectron_model")
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """Динамически квантует Linear-слои модели (box head) в INT8."""
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def torchscript_paths(model_name: str, int8: bool = False):
+    """Возвращает пути к экспортированной модели и схеме её выходов."""
+    suffix = "_int8" if int8 else ""
+    base = os.path.join(MODELS_DIR, f"{model_name}{suffix}")
+    return f"{base}.ts", f"{base}.schema"
+
+
+class TorchScriptModel:
+    """Трассированная модель с интерфейсом GeneralizedRCNN (список входов → список выходов)."""
+
+    def __init__(self, module: torch.jit.ScriptModule, outputs_schema):
+        self.module = module
+        self.outputs_schema = outputs_schema
+
+    @classmethod
+    def load(cls, model_name: str, int8: bool = False) -> "TorchScriptModel":
+        module_path, schema_path = torchscript_paths(model_name, int8)
+        module = torch.jit.load(module_path)
+        module.eval()
+        return cls(module, torch.load(schema_path))
+
+    def __call__(self, batched_inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results = []
+        with torch.no_grad():
+            for inputs in batched_inputs:
+                image = inputs["image"]
+                outputs = self.module(image)
+                instances = self.outputs_schema(outputs)[0]["instances"]
+                height = inputs.get("height", image.shape[1])
+                width = inputs.get("width", image.shape[2])
+                results.append(
+                    {"instances": detector_postprocess(instances, height, width)})
+        return results
+
+
+def load_backend_model(model: torch.nn.Module, model_name: str, backend: str = None):
+    """Возвращает модель для выбранного бэкенда вместо исходной eager-модели."""
+    backend = backend or PREDICT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Неизвестный бэкенд {backend}, допустимые: {', '.join(BACKENDS)}")
+
+    if backend == "eager":
+        return model
+    if backend == "int8":
+        return quantize_model(model)
+
+    int8 = backend == "torchscript-int8"
+    module_path, _ = torchscript_paths(model_name, int8)
+    if not os.path.exists(module_path):
+        logger.warning(
+            "Нет экспортированной модели %s, используется eager. "
+            "Выполните python export_models.py%s",
+            module_path, " --int8" if int8 else "",
+        )
+        return model
+    return TorchScriptModel.load(model_name, int8)
+
+
+def export_torchscript(model: torch.nn.Module, inputs: Dict[str, Any], model_name: str,
+                       int8: bool = False) -> str:
+    """Трассирует модель на примере входа и сохраняет её в detectron_model/."""
+    from detectron2.export import TracingAdapter
+
+    if int8:
+        model = quantize_model(model)
+    model.eval()
+
+    def inference(m, batched_inputs):
+        instances = m.inference(batched_inputs, do_postprocess=False)[0]
+        return [{"instances": instances}]
+
+    adapter = TracingAdapter(model, [{"image": inputs["image"]}], inference)
+    with torch.no_grad():
+        traced = torch.jit.trace(adapter, adapter.flattened_inputs)
+
+    module_path, schema_path = torchscript_paths(model_name, int8)
+    traced.save(module_path)
+    torch.save(adapter.outputs_schema, schema_path)
+    return module_path
+
+
+def _iou(a: Sequence[float], b: Sequence[float]) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _box(prediction) -> List[float]:
+    return [
+        float(prediction.top_left_x),
+        float(prediction.top_left_y),
+        float(prediction.bottom_right_x),
+        float(prediction.bottom_right_y),
+    ]
+
+
+def compare_predictions(reference: list, candidate: list, iou_threshold: float = 0.5) -> Dict[str, Any]:
+    """Сопоставляет предсказания двух бэкендов и возвращает отклонения.
+
+    Пары ищутся жадно по IoU среди предсказаний одного класса. Для
+    KeyPointPrediction дополнительно сравниваются head и tail.
+    """
+    unmatched = list(range(len(candidate)))
+    box_deltas = []
+    keypoint_deltas = []
+    ious = []
+
+    for ref in reference:
+        best, best_iou = None, iou_threshold
+        for idx in unmatched:
+            cand = candidate[idx]
+            if cand.predicted_label != ref.predicted_label:
+                continue
+            iou = _iou(_box(ref), _box(cand))
+            if iou >= best_iou:
+                best, best_iou = idx, iou
+        if best is None:
+            continue
+
+        unmatched.remove(best)
+        cand = candidate[best]
+        ious.append(best_iou)
+        box_deltas.append(
+            float(np.max(np.abs(np.subtract(_box(ref), _box(cand))))))
+        if hasattr(ref, "head"):
+            keypoint_deltas.append(float(max(
+                np.max(np.abs(np.subtract(ref.head[:2], cand.head[:2]))),
+                np.max(np.abs(np.subtract(ref.tail[:2], cand.tail[:2]))),
+            )))
+
+    return {
+        "reference_count": len(reference),
+        "candidate_count": len(candidate),
+        "matched": len(ious),
+        "min_iou": min(ious) if ious else None,
+        "max_box_delta_px": max(box_deltas) if box_deltas else None,
+        "max_keypoint_delta_px": max(keypoint_deltas) if keypoint_deltas else None,
+    }
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Сколько изображений пакета обрабатывается одновременно (включая ещё не отданные клиенту)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "3"))
+# Максимальный размер одного изображения в пакете или архиве, байт
+BATCH_MAX_ITEM_BYTES = int(os.getenv("BATCH_MAX_ITEM_BYTES", str(50 * 1024 * 1024)))
+# Максимальное число изображений в одном пакете
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+
+ARCHIVE_EXTENSIONS = {".zip"}
+
+
+class BatchItemError(Exception):
+    """Ошибка отдельного изображения пакета: попадает в его строку NDJSON, пакет продолжается."""
+
+
+# Элемент пакета: имя файла и содержимое (или ошибка чтения)
+BatchItem = Tuple[str, Optional[bytes], Optional[str]]
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename.lower())[1]
+
+
+def _open_archive(file) -> zipfile.ZipFile:
+    """Открывает архив из копии загрузки во временном файле.
+
+    SpooledTemporaryFile из Starlette на Python 3.9 не реализует seekable(),
+    без которого zipfile не может читать записи, поэтому архив сначала
+    копируется в обычный временный файл (он удаляется при закрытии архива).
+    """
+    copy = tempfile.TemporaryFile()
+    try:
+        file.seek(0)
+        shutil.copyfileobj(file, copy)
+        copy.seek(0)
+        return zipfile.ZipFile(copy)
+    except zipfile.BadZipFile as e:
+        copy.close()
+        raise BatchItemError(f"Повреждённый zip-архив: {e}")
+    except BaseException:
+        copy.close()
+        raise
+
+
+def _read_archive_entry(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes:
+    with archive.open(info) as entry:
+        data = entry.read(BATCH_MAX_ITEM_BYTES + 1)
+    if len(data) > BATCH_MAX_ITEM_BYTES:
+        raise BatchItemError(
+            f"Файл больше {BATCH_MAX_ITEM_BYTES} байт после распаковки")
+    return data
+
+
+async def iter_archive(filename: str, file, allowed_extensions: Iterable[str]) -> AsyncIterator[BatchItem]:
+    """Лениво читает изображения из zip-архива: в памяти одновременно только одно."""
+    try:
+        archive = await run_in_threadpool(_open_archive, file)
+    except (BatchItemError, OSError) as e:
+        yield filename, None, str(e)
+        return
+
+    # archive.fp — временная копия: zipfile не закрывает переданный ему файл сам
+    with archive, archive.fp:
+        for info in archive.infolist():
+            if info.is_dir() or os.path.basename(info.filename).startswith("."):
+                continue
+            name = f"{filename}/{info.filename}"
+            if _extension(info.filename) not in allowed_extensions:
+                yield name, None, "Недопустимый формат файла"
+                continue
+            if info.file_size > BATCH_MAX_ITEM_BYTES:
+                yield name, None, f"Файл больше {BATCH_MAX_ITEM_BYTES} байт"
+                continue
+            try:
+                data = await run_in_threadpool(_read_archive_entry, archive, info)
+            except Exception as e:
+                # Ошибка одной записи (повреждённые данные, шифрование, неподдерживаемое сжатие)
+                yield name, None, str(e) or e.__class__.__name__
+                continue
+            yield name, data, None
+
+
+async def iter_uploads(uploads, allowed_extensions: Iterable[str]) -> AsyncIterator[BatchItem]:
+    """Перебирает загруженные файлы; zip-архивы разворачиваются по одному изображению.
+
+    Starlette хранит крупные части multipart во временных файлах, поэтому
+    содержимое читается только когда до него доходит очередь.
+    """
+    count = 0
+    for upload in uploads:
+        filename = upload.filename or ""
+        extension = _extension(filename)
+        if extension in ARCHIVE_EXTENSIONS:
+            items = iter_archive(filename, upload.file, allowed_extensions)
+        else:
+            items = _iter_single(upload, filename, extension, allowed_extensions)
+
+        async for item in items:
+            count += 1
+            if count > BATCH_MAX_ITEMS:
+                yield item[0], None, f"Превышен лимит пакета в {BATCH_MAX_ITEMS} изображений"
+                return
+            yield item
+
+
+async def _iter_single(upload, filename: str, extension: str,
+                       allowed_extensions: Iterable[str]) -> AsyncIterator[BatchItem]:
+    if not filename:
+        yield filename, None, "Имя файла отсутствует"
+        return
+    if extension not in allowed_extensions:
+        yield filename, None, "Недопустимый формат файла"
+        return
+    data = await upload.read(BATCH_MAX_ITEM_BYTES + 1)
+    if len(data) > BATCH_MAX_ITEM_BYTES:
+        yield filename, None, f"Файл больше {BATCH_MAX_ITEM_BYTES} байт"
+        return
+    yield filename, data, None
+
+
+def _ndjson_line(payload: dict) -> bytes:
+    return (json.dumps(payload, ensure_ascii=False) + "\n").encode()
+
+
+async def stream_batch(items: AsyncIterator[BatchItem],
+                       convert_item: Callable[[str, bytes], Awaitable[dict]],
+                       concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[bytes]:
+    """Обрабатывает элементы пакета параллельно и отдаёт строку NDJSON по мере готовности каждого.
+
+    Слот освобождается только после того, как строка передана клиенту, поэтому
+    в памяти одновременно не больше concurrency изображений и результатов
+    независимо от размера пакета. Ошибка элемента не прерывает пакет.
+    """
+    slots = asyncio.Semaphore(max(1, concurrency))
+    results: asyncio.Queue = asyncio.Queue()
+    tasks = set()
+
+    async def process(index: int, name: str, data: Optional[bytes], error: Optional[str]):
+        line = {"index": index, "filename": name}
+        if error is None:
+            try:
+                line.update(await convert_item(name, data))
+            except Exception as e:
+                logger.warning("Ошибка обработки %s: %s", name, e)
+                error = str(e) or e.__class__.__name__
+        if error is not None:
+            line.update({"status": "error", "error": error})
+        await results.put(_ndjson_line(line))
+
+    async def produce():
+        index = 0
+        try:
+            async for name, data, error in items:
+                await slots.acquire()
+                task = asyncio.ensure_future(process(index, name, data, error))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+            if tasks:
+                await asyncio.gather(*tasks)
+        except Exception as e:
+            # Ошибка чтения самого запроса: сообщаем отдельной строкой и завершаем пакет
+            logger.warning("Ошибка чтения пакета: %s", e)
+            await slots.acquire()
+            await results.put(_ndjson_line(
+                {"index": index, "status": "error", "error": str(e)}))
+        await results.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            line = await results.get()
+            if line is None:
+                break
+            yield line
+            slots.release()
+    finally:
+        # Клиент отключился или пакет завершён: останавливаем незаконченную работу
+        producer.cancel()
+        for task in list(tasks):
+            task.cancel()
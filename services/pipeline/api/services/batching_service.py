@@ -0,0 +1,115 @@
+import logging
+import math
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from numpy import ndarray
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchItem:
+    """Изображение, ожидающее обработки в составе батча."""
+
+    def __init__(self, image: ndarray, bucket: int):
+        self.image = image
+        self.bucket = bucket
+        self.future = Future()
+
+
+def aspect_bucket(image: ndarray, step: float = 0.25) -> int:
+    """Возвращает номер корзины по соотношению сторон (шаг в log2-шкале)."""
+    height, width = image.shape[:2]
+    if height == 0 or width == 0:
+        return 0
+    return int(round(math.log2(width / height) / step))
+
+
+class MicroBatcher:
+    """Собирает изображения из параллельных запросов в батчи для одной модели.
+
+    Изображения, пришедшие в течение ``max_wait_ms`` после первого в корзине,
+    группируются по соотношению сторон (чтобы паддинг батча был минимальным)
+    и передаются в ``batch_fn`` одним вызовом. Батч отправляется раньше,
+    если корзина набрала ``max_batch_size`` изображений.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[ndarray]], List[Any]],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, image: ndarray) -> Future:
+        """Ставит изображение в очередь и возвращает Future с результатом."""
+        self._ensure_started()
+        item = _BatchItem(image, aspect_bucket(image))
+        self._queue.put(item)
+        return item.future
+
+    def __call__(self, image: ndarray):
+        return self.submit(image).result()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        pending: Dict[int, List[_BatchItem]] = {}
+        deadlines: Dict[int, float] = {}
+
+        while True:
+            timeout = None
+            if deadlines:
+                timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                bucket = pending.setdefault(item.bucket, [])
+                if not bucket:
+                    deadlines[item.bucket] = time.monotonic() + self.max_wait
+                bucket.append(item)
+                if len(bucket) >= self.max_batch_size:
+                    self._flush(pending, deadlines, item.bucket)
+
+            now = time.monotonic()
+            for key in [k for k, deadline in deadlines.items() if deadline <= now]:
+                self._flush(pending, deadlines, key)
+
+    def _flush(self, pending, deadlines, key):
+        items = pending.pop(key)
+        deadlines.pop(key)
+
+        try:
+            results = self.batch_fn([item.image for item in items])
+        except Exception as e:
+            logger.exception("Ошибка батча %s (%d изображений)",
+                             self.name, len(items))
+            for item in items:
+                item.future.set_exception(e)
+            return
+
+        for item, result in zip(items, results):
+            item.future.set_result(result)
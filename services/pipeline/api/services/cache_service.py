@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from numpy import ndarray
+
+from commons.utils import here
+
+logger = logging.getLogger(__name__)
+
+# Размер in-memory LRU в байтах (0 — кэш выключен)
+CONVERT_CACHE_MAX_BYTES = int(
+    os.getenv("CONVERT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Каталог дискового уровня кэша (пусто — только память)
+CONVERT_CACHE_DIR = os.getenv("CONVERT_CACHE_DIR", "")
+# Размер дискового уровня в байтах
+CONVERT_CACHE_DISK_MAX_BYTES = int(
+    os.getenv("CONVERT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Файлы весов и переменные окружения, влияющие на результат конвертации
+_WEIGHT_FILES = (
+    here("../../detectron_model/object_detection_model.pth"),
+    here("../../detectron_model/keypoint_detection_model.pth"),
+)
+_CONFIG_VARIABLES = (
+    "PREDICT_BACKEND",
+    "PREDICT_TILE_THRESHOLD",
+    "PREDICT_TILE_SIZE",
+    "PREDICT_TILE_OVERLAP",
+    "PREDICT_TILE_NMS_IOU",
+    "OCR_MODE",
+    "ID_MODE",
+    "CONVERT_CACHE_VERSION",
+)
+
+
+def config_fingerprint() -> str:
+    """Версия моделей и настроек: меняется при замене весов или конфигурации."""
+    parts = []
+    for path in _WEIGHT_FILES:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    for name in _CONFIG_VARIABLES:
+        parts.append(f"{name}={os.getenv(name, '')}")
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+class ResultCache:
+    """Кэш результатов конвертации по хэшу пикселей изображения.
+
+    Первый уровень — LRU в памяти с вытеснением по суммарному размеру,
+    второй (необязательный) — файлы в ``disk_dir``, переживающие перезапуск.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: str = "", disk_max_bytes: int = 0,
+                 version: str = ""):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.version = version
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypasses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._disk_files())
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or bool(self.disk_dir)
+
+    def make_key(self, *images: ndarray, variant: str = "json") -> str:
+        """Вычисляет ключ по пикселям изображений, версии моделей и формату ответа."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{self.version}:{variant}".encode())
+        seen = []
+        for img in images:
+            if any(img is other for other in seen):
+                continue
+            seen.append(img)
+            digest.update(f"{img.shape}:{img.dtype.str}".encode())
+            digest.update(memoryview(img if img.flags.c_contiguous else img.copy()))
+        return digest.hexdigest()
+
+    def count_bypass(self):
+        with self._lock:
+            self._counters["bypasses"] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Возвращает закэшированный ответ или None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["disk_hits"] += 1
+            self._put_memory(key, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        """Сохраняет ответ в память и на диск."""
+        with self._lock:
+            self._put_memory(key, value)
+        self._write_disk(key, value)
+
+    def _put_memory(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self._counters["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.bin")
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as cache_file:
+                return cache_file.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, value: bytes):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as cache_file:
+                cache_file.write(value)
+            # При перезаписи ключа старый файл уже учтён в _disk_size
+            try:
+                replaced_size = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Не удалось записать кэш %s: %s", path, e)
+            return
+
+        with self._lock:
+            self._disk_size += len(value) - replaced_size
+            if self._disk_size <= self.disk_max_bytes:
+                return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Удаляет самые старые файлы, пока диск не освободится до 90% лимита."""
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * 0.9
+        removed = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._disk_size = total
+            self._counters["disk_evictions"] += removed
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий и промахов, текущие размеры уровней."""
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "memory_bytes": self._size,
+                "memory_max_bytes": self.max_bytes,
+                "disk_bytes": self._disk_size,
+            }
+
+
+result_cache = ResultCache(
+    CONVERT_CACHE_MAX_BYTES,
+    CONVERT_CACHE_DIR,
+    CONVERT_CACHE_DISK_MAX_BYTES,
+    config_fingerprint(),
+)
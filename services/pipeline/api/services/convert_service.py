@@ -1,6 +1,7 @@
 import math
 import json
-import jinja2
+import os
+import numpy as np
 from typing import List, Dict, Any, Union, Optional, TYPE_CHECKING
 
 from bpmn.bpmn_elements import (
@@ -11,7 +12,13 @@ from bpmn.bpmn_elements import (
 from bpmn.bpmn_flows import Flow, SequenceFlow, MessageFlow
 from bpmn.element_factories import get_factory, CATEGORIES
 from bpmn.flow_factories import get_keypoint_factory
-from commons.utils import get_nearest_element, here
+from bpmn import rendering
+from commons.spatial_index import SpatialIndex
+
+# numpy — матричная привязка потоков, python — прежняя поэлементная (для сравнения)
+LINK_FLOWS_ENGINE = os.getenv("LINK_FLOWS_ENGINE", "numpy")
+# Число потоков, обрабатываемых numpy-версией за один шаг (ограничивает память)
+LINK_FLOWS_BLOCK_SIZE = 256
 
 if TYPE_CHECKING:
     from bpmn.predictions import (
@@ -37,15 +44,13 @@ def convert_object_predictions(predictions: List["ObjectPrediction"]):
 def render_diagram(bpmn_diagram: Diagram):
     """Рендерит диаграмму в BPMN XML-строку."""
 
-    template_loader = jinja2.FileSystemLoader(
-        searchpath=here("../../commons/templates/")
-    )
-    template_env = jinja2.Environment(loader=template_loader)
-    template_file = "bpmntemplate.jinja"
-    template = template_env.get_template(template_file)
-    output_text = template.render({"diagram": bpmn_diagram})
+    return rendering.render_diagram(bpmn_diagram)
+
 
-    return output_text
+def stream_diagram(bpmn_diagram: Diagram):
+    """Рендерит диаграмму в BPMN XML по частям (байты UTF-8) для потоковой отдачи."""
+
+    return rendering.stream_diagram(bpmn_diagram)
 
 
 def convert_keypoint_prediction(predictions: List["KeyPointPrediction"]):
@@ -62,53 +67,186 @@ def convert_keypoint_prediction(predictions: List["KeyPointPrediction"]):
     return flows
 
 
-def link_flows(flows: List[Flow], elements: List[Element]):
-    """Привязывает потоки к ближайшим элементам (source/target)."""
+def link_flows(flows: List[Flow], elements: List[Element], engine: Optional[str] = None):
+    """Привязывает потоки к ближайшим элементам (source/target).
 
-    def _xy(point):
-        return point[0], point[1]
+    engine — реализация: "numpy" (матричная) или "python" (поэлементная),
+    по умолчанию берётся из LINK_FLOWS_ENGINE. Результаты совпадают.
+    """
+
+    if (engine or LINK_FLOWS_ENGINE) == "python":
+        return _link_flows_python(flows, elements)
+    return _link_flows_numpy(flows, elements)
+
+
+def _assign_flow(flow: Flow, source: Element, target: Element):
+    """Записывает source/target потока и добавляет его во входящие/исходящие элементов."""
+
+    flow.sourceRef = source.id
+    flow.targetRef = target.id
 
-    def _point_inside(point, element, padding=4.0):
-        x, y = _xy(point)
+    if not isinstance(source, Participant):
+        source.outgoing.append(flow.id)
+    if not isinstance(target, Participant):
+        target.incoming.append(flow.id)
+
+
+def _link_flows_numpy(flows: List[Flow], elements: List[Element]):
+    """Матричная версия link_flows: расстояния и попадания считаются блоками потоков.
+
+    Правила те же, что в _link_flows_python: source — ближайший элемент,
+    в рамку которого (с отступом 4 px) попадает хвост стрелки, иначе просто
+    ближайший; target — то же для головы без source, а для потоков сообщений
+    ещё и без элементов того же пула. При равных расстояниях выигрывает
+    элемент, стоящий раньше в списке (argmin возвращает первый минимум).
+
+    Потоки обрабатываются блоками по LINK_FLOWS_BLOCK_SIZE строк, поэтому
+    память растёт линейно по числу элементов, а не как потоки × элементы.
+    Расстояния сравниваются в квадрате и во float32, как в исходной
+    поэлементной версии, — порядок кандидатов (и выбор при равенстве) тот же.
+    """
+
+    participants = [el for el in elements if isinstance(el, Participant)]
+    candidates = [el for el in elements if not isinstance(el, Participant)]
+    if not flows or not candidates:
+        return elements, flows
+
+    def _boxes(items):
+        return np.array([
+            [el.prediction.top_left_x, el.prediction.top_left_y,
+             el.prediction.bottom_right_x, el.prediction.bottom_right_y]
+            for el in items
+        ], dtype=np.float64).reshape(-1, 4)
+
+    def _points(items):
+        return np.array([[p[0], p[1]] for p in items], dtype=np.float64).reshape(-1, 2)
+
+    def _inside(points, boxes, padding=4.0):
+        x, y = points[:, 0:1], points[:, 1:2]
         return (
-            element.prediction.top_left_x -
-            padding <= x <= element.prediction.bottom_right_x + padding
-            and element.prediction.top_left_y - padding <= y <= element.prediction.bottom_right_y + padding
+            (boxes[None, :, 0] - padding <= x) & (x <= boxes[None, :, 2] + padding)
+            & (boxes[None, :, 1] - padding <= y) & (y <= boxes[None, :, 3] + padding)
+        )
+
+    def _distances(points, centers):
+        # Квадрат расстояния без промежуточного массива потоки × элементы × 2
+        points = points.astype(np.float32)
+        dx = points[:, 0:1] - centers[None, :, 0]
+        dy = points[:, 1:2] - centers[None, :, 1]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        return dx
+
+    def _masked_argmin(distances, mask):
+        return np.where(mask, distances, np.inf).argmin(axis=1)
+
+    boxes = _boxes(candidates)
+    centers = _points([el.prediction.center for el in candidates])
+    centers32 = centers.astype(np.float32)
+    tails = _points([flow.prediction.tail for flow in flows])
+    heads = _points([flow.prediction.head for flow in flows])
+    is_message = np.array([not isinstance(flow, SequenceFlow) for flow in flows])
+    indices = np.arange(len(candidates))
+
+    # Пул элемента (индекс участника, содержащего центр) или -1
+    owners = None
+    if is_message.any() and participants:
+        owned = _inside(centers, _boxes(participants))
+        owners = np.where(owned.any(axis=1), owned.argmax(axis=1), -1)
+
+    sources = np.empty(len(flows), dtype=np.intp)
+    targets = np.empty(len(flows), dtype=np.intp)
+    for start in range(0, len(flows), LINK_FLOWS_BLOCK_SIZE):
+        block = slice(start, start + LINK_FLOWS_BLOCK_SIZE)
+
+        # source: ближайший среди содержащих хвост, иначе ближайший вообще
+        tail_distances = _distances(tails[block], centers32)
+        tail_inside = _inside(tails[block], boxes)
+        block_sources = np.where(
+            tail_inside.any(axis=1),
+            _masked_argmin(tail_distances, tail_inside),
+            tail_distances.argmin(axis=1),
+        )
+        del tail_distances, tail_inside
+
+        # Пул целей: для потоков сообщений — элементы вне пула source
+        pool = np.ones((len(block_sources), len(candidates)), dtype=bool)
+        block_messages = is_message[block]
+        if owners is not None and block_messages.any():
+            source_owners = owners[block_sources[block_messages]]
+            message_pool = (owners[None, :] == -1) | (owners[None, :] != source_owners[:, None])
+            message_pool[~message_pool.any(axis=1)] = True
+            pool[block_messages] = message_pool
+
+        # target: как source, но без самого source; если исключать нечего — весь пул
+        allowed = pool & (indices[None, :] != block_sources[:, None])
+        head_distances = _distances(heads[block], centers32)
+        head_inside = _inside(heads[block], boxes) & allowed
+        targets[block] = np.where(
+            head_inside.any(axis=1),
+            _masked_argmin(head_distances, head_inside),
+            np.where(
+                allowed.any(axis=1),
+                _masked_argmin(head_distances, allowed),
+                _masked_argmin(head_distances, pool),
+            ),
         )
+        sources[block] = block_sources
+
+    for flow, source_idx, target_idx in zip(flows, sources, targets):
+        _assign_flow(flow, candidates[source_idx], candidates[target_idx])
+
+    return elements, flows
+
+
+def _link_flows_python(flows: List[Flow], elements: List[Element]):
+    """Поэлементная версия link_flows (эталон для сравнения с numpy-версией)."""
+
+    def _xy(point):
+        return point[0], point[1]
 
     def _distance(point, element):
         px, py = _xy(point)
         cx, cy = element.prediction.center
         return math.sqrt(pow(px - cx, 2) + pow(py - cy, 2))
 
+    participants = [el for el in elements if isinstance(el, Participant)]
+    element_candidates = [
+        el for el in elements if not isinstance(el, Participant)]
+    candidates_index = SpatialIndex(element_candidates)
+    participants_index = SpatialIndex(participants)
+
     def _closest(point, candidates, exclude_ids=None):
         if not candidates:
             return None
         exclude_ids = exclude_ids or set()
-
-        def _best(pool):
-            ranked = sorted(pool, key=lambda el: _distance(point, el))
-            for el in ranked:
-                if el.id not in exclude_ids:
-                    return el
-            return None
-
-        inside = [el for el in candidates if _point_inside(point, el)]
+        if candidates is element_candidates:
+            def in_pool(el): return True
+        else:
+            pool_ids = {id(el) for el in candidates}
+            def in_pool(el): return id(el) in pool_ids
+
+        inside = [
+            el for el in candidates_index.containing(_xy(point), padding=4.0)
+            if in_pool(el) and el.id not in exclude_ids
+        ]
         if inside:
-            choice = _best(inside)
-            if choice:
-                return choice
-        return _best(candidates) or get_nearest_element(_xy(point), candidates)
+            return min(inside, key=lambda el: _distance(point, el))
+        return (
+            candidates_index.nearest(
+                _xy(point), lambda el: in_pool(el) and el.id not in exclude_ids)
+            or candidates_index.nearest(_xy(point), in_pool)
+        )
 
-    participants = [el for el in elements if isinstance(el, Participant)]
-    element_candidates = [
-        el for el in elements if not isinstance(el, Participant)]
+    owners = {}
 
     def _owner(element: Element):
-        for participant in participants:
-            if _point_inside(element.prediction.center, participant):
-                return participant
-        return None
+        if id(element) not in owners:
+            found = participants_index.containing(
+                element.prediction.center, padding=4.0)
+            owners[id(element)] = found[0] if found else None
+        return owners[id(element)]
 
     for flow in flows:
         candidates = element_candidates
@@ -131,13 +269,7 @@ def link_flows(flows: List[Flow], elements: List[Element]):
         if source is None or target is None:
             continue
 
-        flow.sourceRef = source.id
-        flow.targetRef = target.id
-
-        if not isinstance(source, Participant):
-            source.outgoing.append(flow.id)
-        if not isinstance(target, Participant):
-            target.incoming.append(flow.id)
+        _assign_flow(flow, source, target)
 
     return elements, flows
 
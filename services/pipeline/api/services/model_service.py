@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from api.services import predict_service as ps
+
+logger = logging.getLogger(__name__)
+
+# Загружать модели в фоне сразу после старта (0 — при первом запросе)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"
+# Число прогонов на синтетических изображениях после загрузки (0 — без прогрева)
+MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", "1"))
+# Размеры синтетических изображений для прогрева, ШxВ через запятую
+MODEL_WARMUP_SIZES = os.getenv("MODEL_WARMUP_SIZES", "1000x700")
+
+MODEL_NAMES = (ps.ObjectPredictor.model_name, ps.KeyPointPredictor.model_name)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for item in value.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        width, height = item.split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+class ModelManager:
+    """Жизненный цикл моделей: фоновая загрузка, прогрев и состояние для health-проб.
+
+    Загрузка выполняется через исполнитель моделей: в режиме потоков модели
+    попадают в процесс сервера, в режиме процессов — в воркеры (задач прогрева
+    столько же, сколько воркеров). Задачи не привязаны к воркерам, поэтому
+    прогрев может достаться не каждому: warmed_workers в status() — сколько
+    воркеров его выполнили; остальные загружают модели при старте (_init_worker).
+    После перезапуска пула воркеров (restart) модели снова считаются
+    загружающимися, пока прогрев не пройдёт в новом пуле.
+    """
+
+    def __init__(self, model_names: Sequence[str] = MODEL_NAMES,
+                 preload: bool = MODEL_PRELOAD,
+                 warmup_runs: int = MODEL_WARMUP_RUNS,
+                 warmup_sizes: Sequence[Tuple[int, int]] = None):
+        # Без предзагрузки сервис считается готовым сразу: модели грузит первый запрос
+        self.preload = preload
+        self.warmup_runs = warmup_runs
+        self.warmup_sizes = list(warmup_sizes if warmup_sizes is not None
+                                 else parse_sizes(MODEL_WARMUP_SIZES))
+        self.started_at = time.time()
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[Executor] = None
+        self._tasks_per_model = 1
+        # Номер текущего прогрева: результаты прогрева до перезапуска пула отбрасываются
+        self._generation = 0
+        self._models: Dict[str, dict] = {
+            name: {
+                "state": PENDING,
+                "load_seconds": None,
+                "warmup_seconds": None,
+                "ready_after_seconds": None,
+                "warmed_workers": None,
+                "error": None,
+            }
+            for name in model_names
+        }
+
+    def start(self, executor: Executor, tasks_per_model: int = 1):
+        """Запускает загрузку и прогрев в фоне; возвращается сразу."""
+        if not self.preload or self._thread is not None:
+            return
+        self.started_at = time.time()
+        self._executor = executor
+        self._tasks_per_model = max(1, tasks_per_model)
+        self._launch()
+
+    def restart(self):
+        """Повторяет загрузку и прогрев после перезапуска пула воркеров."""
+        if not self.preload or self._executor is None:
+            return
+        logger.warning("Пул воркеров перезапущен, повторный прогрев моделей")
+        self.restarts += 1
+        self._launch()
+
+    def _launch(self):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            for model in self._models.values():
+                model.update(state=LOADING, error=None)
+        self._thread = threading.Thread(
+            target=self._load_all, args=(generation, time.time()),
+            name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _update(self, name: str, generation: int, **fields):
+        with self._lock:
+            if generation == self._generation:
+                self._models[name].update(fields)
+
+    def _load_all(self, generation: int, loading_started: float):
+        futures = {}
+        for name in self._models:
+            futures[name] = [
+                self._executor.submit(ps.warm_up_model, name, self.warmup_runs, self.warmup_sizes)
+                for _ in range(self._tasks_per_model)
+            ]
+
+        for name, model_futures in futures.items():
+            wait(model_futures)
+            results, errors = [], []
+            for future in model_futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+
+            if errors:
+                logger.error("Не удалось загрузить модель %s: %s", name, errors[0])
+                self._update(name, generation, state=FAILED, error=str(errors[0]))
+                continue
+
+            # В режиме процессов время берётся по самому медленному воркеру
+            load_seconds = max(r["load_seconds"] for r in results)
+            warmup_seconds = max(r["warmup_seconds"] for r in results)
+            self._update(
+                name,
+                generation,
+                state=READY,
+                load_seconds=round(load_seconds, 3),
+                warmup_seconds=round(warmup_seconds, 3),
+                ready_after_seconds=round(time.time() - loading_started, 3),
+                warmed_workers=len({r["pid"] for r in results}),
+            )
+            logger.info("Модель %s готова: загрузка %.1f с, прогрев %.1f с", name,
+                        load_seconds, warmup_seconds)
+
+    def _all_ready(self, models: Dict[str, dict]) -> bool:
+        return not self.preload or all(model["state"] == READY for model in models.values())
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._all_ready(self._models)
+
+    def status(self) -> dict:
+        with self._lock:
+            models = {name: dict(model) for name, model in self._models.items()}
+        return {
+            "ready": self._all_ready(models),
+            "preload": self.preload,
+            "restarts": self.restarts,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "models": models,
+        }
+
+
+model_manager = ModelManager()
@@ -1,36 +1,182 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
 import pytesseract
-from typing import List
+from cv2 import cv2
 from numpy import ndarray
-from bpmn.bpmn_elements import Participant, Element
+from bpmn.bpmn_elements import (
+    Participant, Element,
+    StartEvent, EndEvent, IntermediateThrowEvent, IntermediateCatchEvent,
+    Gateway, Task, TextAnnotation
+)
+from bpmn.bpmn_flows import Flow
 from bpmn.predictions import Text
-from commons.utils import get_nearest_element
+from commons.spatial_index import SpatialIndex
 
+try:
+    import tesserocr
+except ImportError:  # tesserocr необязателен, без него OCR идёт через pytesseract
+    tesserocr = None
 
-def get_text_from_img(img: ndarray) -> List[Text]:
-    """Извлекает текст из изображения через OCR (pytesseract)."""
+# auto — tesserocr, если установлен, иначе pytesseract
+OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+# Сколько инициализированных движков Tesseract держать в процессе
+OCR_ENGINE_POOL_SIZE = int(os.getenv("OCR_ENGINE_POOL_SIZE", "3"))
+OCR_LANG = "rus+eng"
+# --psm 12 — разреженный текст с определением ориентации
+OCR_PSM = 12
+# sparse — OCR всего изображения и привязка слов к ближайшему элементу,
+# regions — OCR областей подписей найденных элементов после детекции
+OCR_MODE = os.getenv("OCR_MODE", "sparse")
+# Сколько областей распознавать параллельно в режиме regions
+OCR_REGION_WORKERS = int(os.getenv("OCR_REGION_WORKERS", "4"))
+
+# Режимы сегментации Tesseract для областей
+PSM_BLOCK = 6
+PSM_SPARSE = 11
+# Ширина полосы с названием пула (bpmn.io рисует её шириной 30 px)
+PARTICIPANT_BAND = 30.0
+# Отступ вокруг стрелки, в котором ищется её подпись
+FLOW_LABEL_MARGIN = 20.0
+
+# Пул потоков для параллельного OCR областей (потоки создаются по мере надобности)
+_region_executor = ThreadPoolExecutor(max_workers=OCR_REGION_WORKERS)
+
+Word = Tuple[int, int, int, int, str]
+
+
+class TesseractPool:
+    """Пул инициализированных движков Tesseract (tesserocr.PyTessBaseAPI).
+
+    Языковые модели загружаются один раз при создании движка, а не на каждый
+    запрос, как при запуске процесса tesseract через pytesseract. Движки
+    создаются по требованию, но не больше ``size``; остальные потоки ждут.
+    """
+
+    def __init__(self, size: int, lang: str):
+        self.size = max(1, size)
+        self.lang = lang
+        self._engines = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._engines.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return tesserocr.PyTessBaseAPI(lang=self.lang)
+        return self._engines.get()
+
+    @contextmanager
+    def engine(self):
+        api = self._acquire()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._engines.put(api)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _use_tesserocr() -> bool:
+    if OCR_ENGINE == "pytesseract":
+        return False
+    if tesserocr is None:
+        if OCR_ENGINE == "tesserocr":
+            raise RuntimeError("OCR_ENGINE=tesserocr, но tesserocr не установлен")
+        return False
+    return True
 
-    text_list = []
 
-    # rus+eng — русский + английский; --psm 12 — режим для разреженного текста
+def get_engine_pool() -> TesseractPool:
+    """Возвращает пул движков процесса, создавая его при первом вызове."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TesseractPool(OCR_ENGINE_POOL_SIZE, OCR_LANG)
+    return _pool
+
+
+def _words_tesserocr(img: ndarray, psm: int) -> List[Word]:
+    """Распознаёт слова движком из пула, передавая буфер numpy напрямую."""
+
+    img = np.ascontiguousarray(img)
+    height, width = img.shape[:2]
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    level = tesserocr.RIL.WORD
+
+    words = []
+    with get_engine_pool().engine() as api:
+        api.SetPageSegMode(psm)
+        api.SetImageBytes(img.tobytes(), width, height,
+                          channels, width * channels)
+        api.Recognize()
+        iterator = api.GetIterator()
+        if iterator is None:
+            return words
+        for word in tesserocr.iterate_level(iterator, level):
+            box = word.BoundingBox(level)
+            text = word.GetUTF8Text(level)
+            if box is None or text is None:
+                continue
+            x1, y1, x2, y2 = box
+            words.append((x1, y1, x2 - x1, y2 - y1, text.strip()))
+    return words
+
+
+def _words_pytesseract(img: ndarray, psm: int) -> List[Word]:
+    """Распознаёт слова отдельным процессом tesseract."""
+
     d = pytesseract.image_to_data(
-        img, output_type=pytesseract.Output.DICT, config="--psm 12 -l rus+eng"
+        img, output_type=pytesseract.Output.DICT, config=f"--psm {psm} -l {OCR_LANG}"
+    )
+    return [
+        (d["left"][i], d["top"][i], d["width"][i], d["height"][i], d["text"][i])
+        for i in range(len(d["level"]))
+    ]
+
+
+def recognize_words(img: ndarray, psm: int = OCR_PSM) -> List[Word]:
+    """Возвращает слова (x, y, w, h, text) выбранным движком OCR."""
+
+    if _use_tesserocr():
+        return _words_tesserocr(img, psm)
+    return _words_pytesseract(img, psm)
+
+
+def _is_valid_word(text: str) -> bool:
+    """Отсекает пустые строки, мусор из символов и повторы одной буквы."""
+
+    return not (
+        len(text) == 0
+        or any(not c.isalnum() for c in text[:-1])
+        or len(text) > 1
+        and not (text[-1].isalnum() or text[-1] in "-?")
+        or text.lower().count(text[0].lower()) == len(text)
     )
-    n_boxes = len(d["level"])
-    for i in range(n_boxes):
-        text = d["text"][i]
-        if (
-            len(text) == 0
-            or any(not c.isalnum() for c in text[:-1])
-            or len(text) > 1
-            and not (text[-1].isalnum() or text[-1] in "-?")
-            or text.lower().count(text[0].lower()) == len(text)
-        ):
-            continue
-        (x, y, w, h) = (d["left"][i], d["top"]
-                        [i], d["width"][i], d["height"][i])
-        text_list.append(([x, y, w, h], text))
 
-    return [Text(txt, *box) for box, txt in text_list]
+
+def get_text_from_img(img: ndarray) -> List[Text]:
+    """Извлекает текст из изображения через OCR (rus+eng, разреженный текст)."""
+
+    return [
+        Text(text, x, y, w, h)
+        for x, y, w, h, text in recognize_words(img)
+        if _is_valid_word(text)
+    ]
 
 
 def link_text(texts: List[Text], elements: List[Element]):
@@ -42,7 +188,121 @@ def link_text(texts: List[Text], elements: List[Element]):
                 el.prediction.top_left_x,
                 el.prediction.top_left_y + el.prediction.height / 2,
             )
+    index = SpatialIndex(elements)
     for text in texts:
-        nearest = get_nearest_element(text.center, elements)
+        nearest = index.nearest(text.center)
         nearest.name.append(text)
     return elements
+
+
+class OcrRegion:
+    """Область изображения для OCR, привязанная к элементу или потоку.
+
+    ``key`` — индекс элемента в списке, по которому строились области,
+    ``box`` — (x0, y0, x1, y1) в координатах изображения, ``rotate`` —
+    повернуть область по часовой стрелке (вертикальная подпись пула).
+    """
+
+    def __init__(self, key: int, box: Tuple[int, int, int, int], psm: int, rotate: bool = False):
+        self.key = key
+        self.box = box
+        self.psm = psm
+        self.rotate = rotate
+
+
+def _clip_box(box, shape) -> Optional[Tuple[int, int, int, int]]:
+    height, width = shape[:2]
+    x0, y0, x1, y1 = box
+    x0, y0 = max(0, int(x0)), max(0, int(y0))
+    x1, y1 = min(width, int(round(x1))), min(height, int(round(y1)))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return x0, y0, x1, y1
+
+
+def _label_region(element: Union[Element, Participant, Flow]) -> Optional[Tuple[tuple, int, bool]]:
+    """Возвращает (область, psm, поворот) подписи в зависимости от типа элемента."""
+
+    p = element.prediction
+    if isinstance(element, Participant):
+        band = min(p.width, max(PARTICIPANT_BAND, 0.05 * p.width))
+        return (p.top_left_x, p.top_left_y, p.top_left_x + band, p.bottom_right_y), PSM_BLOCK, True
+    if isinstance(element, (Task, TextAnnotation)):
+        return (p.top_left_x, p.top_left_y, p.bottom_right_x, p.bottom_right_y), PSM_BLOCK, False
+    if isinstance(element, (StartEvent, EndEvent, IntermediateThrowEvent, IntermediateCatchEvent, Gateway)):
+        # Подпись события или шлюза располагается под фигурой
+        half_width = max(2 * p.width, 50.0)
+        cx = p.center[0]
+        return (cx - half_width, p.bottom_right_y, cx + half_width,
+                p.bottom_right_y + max(p.height, 40.0)), PSM_BLOCK, False
+    if isinstance(element, Flow):
+        return (p.top_left_x - FLOW_LABEL_MARGIN, p.top_left_y - FLOW_LABEL_MARGIN,
+                p.bottom_right_x + FLOW_LABEL_MARGIN, p.bottom_right_y + FLOW_LABEL_MARGIN), PSM_SPARSE, False
+    return None
+
+
+def plan_regions(targets: List[Union[Element, Participant, Flow]], shape) -> List[OcrRegion]:
+    """Строит области OCR для элементов, пулов и потоков.
+
+    Области элементов идут раньше областей потоков: при пересечении слово
+    достаётся элементу (см. attach_region_text).
+    """
+
+    regions = []
+    flow_regions = []
+    for key, target in enumerate(targets):
+        label = _label_region(target)
+        if label is None:
+            continue
+        box, psm, rotate = label
+        box = _clip_box(box, shape)
+        if box is None:
+            continue
+        region = OcrRegion(key, box, psm, rotate)
+        (flow_regions if isinstance(target, Flow) else regions).append(region)
+    return regions + flow_regions
+
+
+def _recognize_region(img: ndarray, region: OcrRegion) -> List[Text]:
+    """Распознаёт область и переводит рамки слов в координаты изображения."""
+
+    x0, y0, x1, y1 = region.box
+    crop = img[y0:y1, x0:x1]
+    crop_height = y1 - y0
+    if region.rotate:
+        crop = cv2.rotate(crop, cv2.ROTATE_90_CLOCKWISE)
+
+    texts = []
+    for x, y, w, h, text in recognize_words(crop, region.psm):
+        if not _is_valid_word(text):
+            continue
+        if region.rotate:
+            # Точка (x, y) повёрнутой области соответствует (y, H - x) исходной
+            x, y, w, h = y, crop_height - x - w, h, w
+        texts.append(Text(text, x0 + x, y0 + y, w, h))
+    return texts
+
+
+def get_text_from_regions(img: ndarray, regions: List[OcrRegion]) -> List[List[Text]]:
+    """Распознаёт области параллельно, возвращает слова для каждой области."""
+
+    return list(_region_executor.map(lambda region: _recognize_region(img, region), regions))
+
+
+def attach_region_text(regions: List[OcrRegion], texts: List[List[Text]],
+                       targets: List[Union[Element, Participant, Flow]]):
+    """Присваивает распознанные слова элементам, для которых строились области.
+
+    Слово, найденное в нескольких пересекающихся областях, достаётся первой.
+    """
+
+    seen = set()
+    for region, region_texts in zip(regions, texts):
+        target = targets[region.key]
+        for text in region_texts:
+            signature = (text.text, round(text.x / 4), round(text.y / 4))
+            if signature in seen:
+                continue
+            seen.add(signature)
+            target.name.append(text)
+    return targets
@@ -1,9 +1,10 @@
-from typing import List
+from typing import Dict, List, Sequence, Tuple
+import os
+import threading
+import time
 import warnings
 
-from detectron2 import model_zoo
-from detectron2.config import get_cfg
-from detectron2.engine import DefaultPredictor
+import numpy as np
 from numpy import ndarray
 
 from bpmn.element_factories import CATEGORIES
@@ -12,8 +13,22 @@ from bpmn.predictions import (
     KeyPointPrediction,
 )
 
+from api.services.batching_service import MicroBatcher
 from commons.utils import here
 
+# torch, detectron2 и зависящие от них backend_service/tiling_service импортируются
+# внутри функций: импорт модуля не должен задерживать запуск сервера
+
+# Микробатчинг между запросами: 1 — выключен (каждое изображение отдельно)
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "1"))
+# Сколько ждать остальные изображения батча после первого, мс
+PREDICT_BATCH_WAIT_MS = float(os.getenv("PREDICT_BATCH_WAIT_MS", "10"))
+# Совмещённый режим: одна предобработка изображения на обе модели за один вызов.
+# Модели при этом идут последовательно в одной задаче, а не параллельно: экономится
+# только resize и перевод в тензор (бэкбоны разные — R50 и R101), поэтому задержка
+# запроса обычно растёт; режим имеет смысл, когда воркеров меньше, чем запросов
+PREDICT_COMBINED = os.getenv("PREDICT_COMBINED", "0") == "1"
+
 # Detectron2 v0.6 + torch 1.10 печатают предупреждения о будущих изменениях API
 warnings.filterwarnings(
     "ignore",
@@ -27,10 +42,77 @@ warnings.filterwarnings(
 )
 
 
-class ObjectPredictor:
+class BasePredictor:
+    """Обёртка над DefaultPredictor с поддержкой батчевого инференса."""
+
+    # Имя файла весов в detectron_model/ без расширения
+    model_name = ""
+
+    def __init__(self, cfg, backend: str = None):
+        from detectron2.engine import DefaultPredictor
+        from api.services import backend_service as bs
+
+        self._predictor = DefaultPredictor(cfg)
+        self.backend = backend or bs.PREDICT_BACKEND
+        self._predictor.model = bs.load_backend_model(
+            self._predictor.model, self.model_name, self.backend)
+        # Параметры предобработки: у моделей с одинаковым ключом она совпадает
+        self.preprocessing_key = (
+            cfg.INPUT.FORMAT,
+            cfg.INPUT.MIN_SIZE_TEST,
+            cfg.INPUT.MAX_SIZE_TEST,
+        )
+        self._batcher = None
+        if PREDICT_BATCH_MAX_SIZE > 1:
+            self._batcher = MicroBatcher(
+                self.predict_batch,
+                max_batch_size=PREDICT_BATCH_MAX_SIZE,
+                max_wait_ms=PREDICT_BATCH_WAIT_MS,
+                name=type(self).__name__,
+            )
+
+    def _prepare_input(self, img: ndarray) -> dict:
+        """Повторяет предобработку DefaultPredictor: формат, resize, тензор."""
+        import torch
+
+        if self._predictor.input_format == "RGB":
+            img = img[:, :, ::-1]
+        height, width = img.shape[:2]
+        image = self._predictor.aug.get_transform(img).apply_image(img)
+        image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+        return {"image": image, "height": height, "width": width}
+
+    def predict_batch(self, imgs: List[ndarray]) -> List[dict]:
+        """Один прямой проход модели для нескольких изображений."""
+        import torch
+
+        with torch.no_grad():
+            inputs = [self._prepare_input(img) for img in imgs]
+            return self._predictor.model(inputs)
+
+    def predict_prepared(self, inputs: dict) -> dict:
+        """Инференс по уже подготовленному входу (см. _prepare_input)."""
+        import torch
+
+        with torch.no_grad():
+            return self._predictor.model([inputs])[0]
+
+    def predict(self, img: ndarray):
+        """Инференс одного изображения (через батчер, если он включён)."""
+        if self._batcher is not None:
+            return self._batcher(img)
+        return self._predictor(img)
+
+
+class ObjectPredictor(BasePredictor):
     """Предиктор Detectron2 для детекции BPMN-элементов (faster_rcnn)."""
 
-    def __init__(self):
+    model_name = "object_detection_model"
+
+    def __init__(self, backend: str = None):
+        from detectron2 import model_zoo
+        from detectron2.config import get_cfg
+
         cfg = get_cfg()
         cfg.merge_from_file(
             model_zoo.get_config_file(
@@ -38,24 +120,22 @@ class ObjectPredictor:
         )
         cfg.OUTPUT_DIR = "output"
         cfg.MODEL.WEIGHTS = here(
-            "../../detectron_model/object_detection_model.pth")
+            f"../../detectron_model/{self.model_name}.pth")
         cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.7
         cfg.MODEL.ROI_HEADS.NUM_CLASSES = len(CATEGORIES)
         cfg.MODEL.DEVICE = "cpu"
-        self._predictor = DefaultPredictor(cfg)
+        super().__init__(cfg, backend)
 
-    def predict(self, img: ndarray):
-        """Детекция BPMN-элементов на изображении."""
 
-        outs = self._predictor(img)
+class KeyPointPredictor(BasePredictor):
+    """Предиктор Detectron2 для детекции стрелок (keypoint_rcnn)."""
 
-        return outs
+    model_name = "keypoint_detection_model"
 
+    def __init__(self, backend: str = None):
+        from detectron2 import model_zoo
+        from detectron2.config import get_cfg
 
-class KeyPointPredictor:
-    """Предиктор Detectron2 для детекции стрелок (keypoint_rcnn)."""
-
-    def __init__(self):
         cfg = get_cfg()
         cfg.merge_from_file(
             model_zoo.get_config_file(
@@ -63,29 +143,85 @@ class KeyPointPredictor:
         )
         cfg.OUTPUT_DIR = "output"
         cfg.MODEL.WEIGHTS = here(
-            "../../detectron_model/keypoint_detection_model.pth")
+            f"../../detectron_model/{self.model_name}.pth")
         cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.8
         cfg.MODEL.ROI_HEADS.NUM_CLASSES = 3
         cfg.MODEL.RETINANET.NUM_CLASSES = 3
         cfg.MODEL.ROI_KEYPOINT_HEAD.NUM_KEYPOINTS = 2
         cfg.MODEL.DEVICE = "cpu"
-        self._predictor = DefaultPredictor(cfg)
+        super().__init__(cfg, backend)
 
-    def predict(self, img):
-        """Детекция стрелок (потоков) на изображении."""
-        outs = self._predictor(img)
 
-        return outs
+_predictors = {}
+_predictors_lock = threading.Lock()
+# Время загрузки моделей в этом процессе, с
+_load_seconds: Dict[str, float] = {}
 
 
-object_predictor = ObjectPredictor()
-keypoint_predictor = KeyPointPredictor()
+def _get_predictor(predictor_class: type) -> BasePredictor:
+    """Возвращает единственный экземпляр предиктора, создавая его при первом вызове."""
+    predictor = _predictors.get(predictor_class)
+    if predictor is None:
+        with _predictors_lock:
+            predictor = _predictors.get(predictor_class)
+            if predictor is None:
+                start = time.perf_counter()
+                predictor = predictor_class()
+                _load_seconds[predictor_class.model_name] = time.perf_counter() - start
+                _predictors[predictor_class] = predictor
+    return predictor
 
 
-def predict_object(image: ndarray) -> List[ObjectPrediction]:
-    """Детектирует BPMN-элементы на изображении."""
+def get_object_predictor() -> ObjectPredictor:
+    """Предиктор BPMN-элементов (загружается при первом обращении)."""
+    return _get_predictor(ObjectPredictor)
+
+
+def get_keypoint_predictor() -> KeyPointPredictor:
+    """Предиктор стрелок (загружается при первом обращении)."""
+    return _get_predictor(KeyPointPredictor)
+
 
-    predictions = object_predictor.predict(image)
+def _synthetic_image(width: int, height: int) -> ndarray:
+    """Белый холст с рамками и линиями: модели получают непустые предложения RPN."""
+    img = np.full((height, width, 3), 255, dtype=np.uint8)
+    step = max(40, min(width, height) // 4)
+    for y in range(step // 2, height - step // 2, step):
+        for x in range(step // 2, width - step, step):
+            x1, y1 = x + step // 2, y + step // 3
+            img[y:y1, x:x + 2] = 0
+            img[y:y1, x1 - 2:x1] = 0
+            img[y:y + 2, x:x1] = 0
+            img[y1 - 2:y1, x:x1] = 0
+            img[y + step // 6, x1:x + step] = 0
+    return img
+
+
+def warm_up_model(model_name: str, runs: int, sizes: Sequence[Tuple[int, int]]) -> dict:
+    """Загружает модель в текущем процессе и прогоняет её на синтетических изображениях.
+
+    Первые прогоны выделяют буферы и выбирают ядра torch, поэтому первый
+    настоящий запрос не платит за холодный старт.
+    """
+    getters = {
+        ObjectPredictor.model_name: get_object_predictor,
+        KeyPointPredictor.model_name: get_keypoint_predictor,
+    }
+    predictor = getters[model_name]()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        for width, height in sizes:
+            predictor.predict(_synthetic_image(width, height))
+    return {
+        "pid": os.getpid(),
+        "load_seconds": _load_seconds.get(model_name, 0.0),
+        "warmup_seconds": time.perf_counter() - start,
+    }
+
+
+def _to_object_predictions(predictions: dict) -> List[ObjectPrediction]:
+    """Преобразует выход faster_rcnn в список ObjectPrediction."""
 
     pred_boxes = predictions.get("instances").get("pred_boxes").tensor.numpy()
     pred_classes = predictions.get("instances").get("pred_classes").numpy()
@@ -95,10 +231,8 @@ def predict_object(image: ndarray) -> List[ObjectPrediction]:
     return [ObjectPrediction(label, *box) for box, label in predictions]
 
 
-def predict_keypoint(image: ndarray) -> List[KeyPointPrediction]:
-    """Детектирует стрелки (потоки) на изображении."""
-
-    predictions = keypoint_predictor.predict(image)
+def _to_keypoint_predictions(predictions: dict) -> List[KeyPointPrediction]:
+    """Преобразует выход keypoint_rcnn в список KeyPointPrediction."""
 
     boxes = predictions.get("instances").get("pred_boxes").tensor.numpy()
     classes = predictions.get("instances").get("pred_classes").numpy()
@@ -110,3 +244,59 @@ def predict_keypoint(image: ndarray) -> List[KeyPointPrediction]:
         KeyPointPrediction(clazz, *box, key[0], key[1])
         for clazz, box, key in predictions
     ]
+
+
+def _predict(predictor: BasePredictor, image: ndarray) -> dict:
+    """Инференс с нарезкой на тайлы для изображений больше PREDICT_TILE_THRESHOLD."""
+    from api.services import tiling_service as ts
+
+    if ts.needs_tiling(image):
+        return ts.predict_tiled(predictor, image)
+    return predictor.predict(image)
+
+
+def predict_object(image: ndarray) -> List[ObjectPrediction]:
+    """Детектирует BPMN-элементы на изображении."""
+
+    return _to_object_predictions(_predict(get_object_predictor(), image))
+
+
+def predict_keypoint(image: ndarray) -> List[KeyPointPrediction]:
+    """Детектирует стрелки (потоки) на изображении."""
+
+    return _to_keypoint_predictions(_predict(get_keypoint_predictor(), image))
+
+
+def predict_combined(
+    predict_image: ndarray, ocr_image: ndarray
+) -> Tuple[List[ObjectPrediction], List[KeyPointPrediction]]:
+    """Детектирует элементы и стрелки с общей предобработкой изображения.
+
+    Если обе модели получают тот же объект изображения (get_ocr_image
+    возвращает его для изображений без альфа-канала) и одинаково его
+    предобрабатывают, resize и перевод в тензор выполняются один раз.
+    Модели выполняются последовательно — см. PREDICT_COMBINED.
+    """
+    from api.services import tiling_service as ts
+
+    if ts.needs_tiling(predict_image):
+        return predict_object(predict_image), predict_keypoint(ocr_image)
+
+    object_predictor = get_object_predictor()
+    keypoint_predictor = get_keypoint_predictor()
+
+    obj_inputs = object_predictor._prepare_input(predict_image)
+    shared = (
+        object_predictor.preprocessing_key == keypoint_predictor.preprocessing_key
+        and ocr_image is predict_image
+    )
+    kp_inputs = obj_inputs if shared else keypoint_predictor._prepare_input(
+        ocr_image)
+
+    obj_predictions = object_predictor.predict_prepared(obj_inputs)
+    kp_predictions = keypoint_predictor.predict_prepared(kp_inputs)
+
+    return (
+        _to_object_predictions(obj_predictions),
+        _to_keypoint_predictions(kp_predictions),
+    )
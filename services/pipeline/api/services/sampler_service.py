@@ -0,0 +1,269 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Период снятия показаний, с
+METRICS_SAMPLE_INTERVAL = float(os.getenv("METRICS_SAMPLE_INTERVAL", "1.0"))
+# Окно агрегатов min/avg/max, с
+METRICS_WINDOW_SECONDS = float(os.getenv("METRICS_WINDOW_SECONDS", "60"))
+# Раздел, для которого считается занятость диска
+METRICS_DISK_PATH = os.getenv("METRICS_DISK_PATH", "/")
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v1 сообщает «без лимита» как очень большое число, кратное странице
+_UNLIMITED_BYTES = 1 << 60
+
+# Показатели, для которых в ответе считаются min/avg/max за окно
+WINDOW_METRICS = (
+    "cpu_percent",
+    "process_cpu_percent",
+    "process_rss_bytes",
+    "process_threads",
+    "memory_percent",
+    "disk_read_bytes_per_s",
+    "disk_write_bytes_per_s",
+    "cgroup_memory_bytes",
+    "cgroup_throttled_percent",
+)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path) as cgroup_file:
+            return cgroup_file.read().strip()
+    except OSError:
+        return None
+
+
+def _read_int(path: str) -> Optional[int]:
+    value = _read_text(path)
+    if value is None or value == "max":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _read_stat(path: str) -> Dict[str, int]:
+    stats = {}
+    for line in (_read_text(path) or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            stats[parts[0]] = int(parts[1])
+    return stats
+
+
+class CgroupReader:
+    """Лимиты и счётчики контейнера из cgroup v2 (unified) или v1."""
+
+    def __init__(self, root: str = CGROUP_ROOT):
+        self.root = root
+        self.version = 2 if os.path.exists(os.path.join(root, "cgroup.controllers")) else 1
+        if self.version == 1 and not os.path.isdir(os.path.join(root, "cpu")):
+            self.version = 0
+
+    def _path(self, v1_controller: str, name: str) -> str:
+        if self.version == 2:
+            return os.path.join(self.root, name)
+        return os.path.join(self.root, v1_controller, name)
+
+    def cpu_limit(self) -> Optional[float]:
+        """Доступные контейнеру CPU по квоте CFS (None — без ограничения)."""
+        if self.version == 2:
+            value = _read_text(self._path("cpu", "cpu.max"))
+            if not value:
+                return None
+            quota, _, period = value.partition(" ")
+            if quota == "max" or not period:
+                return None
+            return int(quota) / int(period)
+        quota = _read_int(self._path("cpu", "cpu.cfs_quota_us"))
+        period = _read_int(self._path("cpu", "cpu.cfs_period_us"))
+        if not quota or quota < 0 or not period:
+            return None
+        return quota / period
+
+    def memory_limit(self) -> Optional[int]:
+        if self.version == 2:
+            return _read_int(self._path("memory", "memory.max"))
+        limit = _read_int(self._path("memory", "memory.limit_in_bytes"))
+        return limit if limit is not None and limit < _UNLIMITED_BYTES else None
+
+    def memory_usage(self) -> Optional[int]:
+        if self.version == 2:
+            return _read_int(self._path("memory", "memory.current"))
+        return _read_int(self._path("memory", "memory.usage_in_bytes"))
+
+    def cpu_throttling(self) -> Dict[str, int]:
+        """Накопленные периоды CFS, из них с троттлингом, и время троттлинга в мкс."""
+        stats = _read_stat(self._path("cpu", "cpu.stat"))
+        if self.version == 2:
+            throttled_usec = stats.get("throttled_usec", 0)
+        else:
+            throttled_usec = stats.get("throttled_time", 0) // 1000
+        return {
+            "nr_periods": stats.get("nr_periods", 0),
+            "nr_throttled": stats.get("nr_throttled", 0),
+            "throttled_usec": throttled_usec,
+        }
+
+
+class ResourceSampler:
+    """Фоновый сбор показателей ресурсов в кольцевой буфер.
+
+    Поток снимает показания раз в interval секунд; эндпоинт метрик читает
+    последнее значение и агрегаты за окно без ожидания и без системных вызовов
+    на каждый запрос.
+    """
+
+    def __init__(self, interval: float = METRICS_SAMPLE_INTERVAL,
+                 window_seconds: float = METRICS_WINDOW_SECONDS):
+        self.interval = max(0.1, interval)
+        self.window_seconds = window_seconds
+        self._samples = deque(maxlen=max(1, int(window_seconds / self.interval)))
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process(os.getpid())
+        self._cgroup = CgroupReader()
+        self._previous_io = None
+        self._previous_throttling = None
+        self._previous_time = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # Первый вызов cpu_percent задаёт точку отсчёта и всегда возвращает 0
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                sample = self.sample()
+            except Exception as e:
+                logger.warning("Не удалось снять показания ресурсов: %s", e)
+                continue
+            with self._lock:
+                self._samples.append(sample)
+
+    def _disk_io(self):
+        try:
+            return psutil.disk_io_counters()
+        except (RuntimeError, OSError):
+            return None
+
+    def sample(self) -> Dict[str, float]:
+        """Снимает одно показание; скорости считаются от предыдущего показания."""
+        with self._sample_lock:
+            return self._sample()
+
+    def _sample(self) -> Dict[str, float]:
+        now = time.monotonic()
+        elapsed = now - self._previous_time if self._previous_time is not None else None
+
+        memory = psutil.virtual_memory()
+        with self._process.oneshot():
+            process_cpu_percent = self._process.cpu_percent(interval=None)
+            process_memory = self._process.memory_info()
+            process_threads = self._process.num_threads()
+
+        sample = {
+            "timestamp": time.time(),
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "process_cpu_percent": process_cpu_percent,
+            "process_rss_bytes": process_memory.rss,
+            "process_vms_bytes": process_memory.vms,
+            "process_threads": process_threads,
+            "memory_used_bytes": memory.used,
+            "memory_available_bytes": memory.available,
+            "memory_percent": memory.percent,
+        }
+
+        io = self._disk_io()
+        if io is not None and self._previous_io is not None and elapsed:
+            sample["disk_read_bytes_per_s"] = max(0, io.read_bytes - self._previous_io.read_bytes) / elapsed
+            sample["disk_write_bytes_per_s"] = max(0, io.write_bytes - self._previous_io.write_bytes) / elapsed
+        self._previous_io = io
+
+        cgroup_memory = self._cgroup.memory_usage()
+        if cgroup_memory is not None:
+            sample["cgroup_memory_bytes"] = cgroup_memory
+
+        throttling = self._cgroup.cpu_throttling()
+        if self._previous_throttling is not None:
+            periods = throttling["nr_periods"] - self._previous_throttling["nr_periods"]
+            throttled = throttling["nr_throttled"] - self._previous_throttling["nr_throttled"]
+            sample["cgroup_throttled_percent"] = 100.0 * throttled / periods if periods > 0 else 0.0
+        sample.update({f"cgroup_{name}": value for name, value in throttling.items()})
+        self._previous_throttling = throttling
+
+        self._previous_time = now
+        return sample
+
+    def samples(self) -> List[Dict[str, float]]:
+        with self._lock:
+            return list(self._samples)
+
+    def snapshot(self) -> Dict:
+        """Последние значения, агрегаты min/avg/max за окно и лимиты контейнера.
+
+        До первого показания фонового потока current пуст, а окно содержит 0 показаний.
+        """
+        samples = self.samples()
+        cgroup = {
+            "version": self._cgroup.version,
+            "cpu_limit": self._cgroup.cpu_limit(),
+            "memory_limit_bytes": self._cgroup.memory_limit(),
+        }
+        if not samples:
+            # Показаний ещё нет. Снимать их здесь нельзя: cpu_percent сбросил бы
+            # точку отсчёта, и следующее показание потока охватило бы неверный интервал
+            return {
+                "current": {},
+                "window": {"seconds": 0.0, "samples": 0, "interval_seconds": self.interval},
+                "cgroup": cgroup,
+            }
+
+        window = {}
+        for name in WINDOW_METRICS:
+            values = [sample[name] for sample in samples if name in sample]
+            if values:
+                window[name] = {
+                    "min": min(values),
+                    "avg": round(sum(values) / len(values), 3),
+                    "max": max(values),
+                }
+
+        return {
+            "current": samples[-1],
+            "window": {
+                "seconds": round(samples[-1]["timestamp"] - samples[0]["timestamp"], 3),
+                "samples": len(samples),
+                "interval_seconds": self.interval,
+                **window,
+            },
+            "cgroup": cgroup,
+        }
+
+
+resource_sampler = ResourceSampler()
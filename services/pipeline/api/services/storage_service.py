@@ -1,38 +1,119 @@
-import os
+from io import BytesIO
+from typing import Optional, Tuple, Union
+
 import numpy as np
 from cv2 import cv2
+from numpy import ndarray
+from PIL import Image
+
+EXIF_ORIENTATION_TAG = 0x0112
+# EXIF у JPEG лежит в сегменте APP1 в начале файла; дальше заголовок не читается
+EXIF_HEADER_BYTES = 256 * 1024
+
+
+def _exif_orientation(data: Union[bytes, bytearray, memoryview]) -> int:
+    """Значение EXIF Orientation JPEG-файла (1 — без поворота), пиксели не декодируются."""
+
+    if bytes(data[:2]) != b"\xff\xd8":
+        return 1
+    try:
+        with Image.open(BytesIO(bytes(data[:EXIF_HEADER_BYTES]))) as img:
+            return int(img.getexif().get(EXIF_ORIENTATION_TAG, 1))
+    except Exception:
+        return 1
+
+
+def apply_exif_orientation(img: ndarray, orientation: int) -> ndarray:
+    """Поворачивает и отражает изображение по EXIF Orientation, как cv2.imread с IMREAD_COLOR."""
+
+    if orientation == 2:
+        img = img[:, ::-1]
+    elif orientation == 3:
+        img = img[::-1, ::-1]
+    elif orientation == 4:
+        img = img[::-1]
+    elif orientation == 5:
+        img = img.swapaxes(0, 1)
+    elif orientation == 6:
+        img = np.rot90(img, -1)
+    elif orientation == 7:
+        img = img.swapaxes(0, 1)[::-1, ::-1]
+    elif orientation == 8:
+        img = np.rot90(img, 1)
+    else:
+        return img
+    return np.ascontiguousarray(img)
+
+
+def decode_image(data: Union[bytes, bytearray, memoryview]) -> Optional[ndarray]:
+    """Декодирует загруженные байты изображения в память без записи на диск.
 
+    IMREAD_UNCHANGED сохраняет альфа-канал, но не применяет EXIF Orientation,
+    поэтому поворот фотографий с телефона выполняется отдельно — изображения
+    для детекции и для OCR получаются в одной (правильной) ориентации.
+    """
 
-def get_ocr_image(image_path: str):
-    """Читает изображение и подготавливает его для OCR."""
-
-    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-    if img is not None and img.shape[2] == 4:
-        trans_mask = img[:, :, 3] == 0
-        img[trans_mask] = [255, 255, 255, 255]
-        img = (
-            img.astype(np.uint16)
-            + 255
-            - np.repeat(np.expand_dims(img[:, :, 3], 2), 4, axis=2)
-        )
-        img = np.ndarray.clip(img, 0, 255)
-        img = img[:, :, [0, 1, 2]]
-        img = np.ascontiguousarray(img, dtype=np.uint8)
+    buffer = np.frombuffer(memoryview(data), dtype=np.uint8)
+    if buffer.size == 0:
+        return None
+    img = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        return None
+    return apply_exif_orientation(img, _exif_orientation(data))
+
+
+def _to_uint8(img: ndarray) -> ndarray:
+    """Приводит 16-битное изображение к 8 битам так же, как cv2.imread."""
+
+    if img.dtype == np.uint16:
+        return np.right_shift(img, 8).astype(np.uint8)
     return img
 
 
-def get_predict_image(image_path: str):
-    """Читает изображение для детекции объектов."""
+def composite_on_white(img: ndarray, out: Optional[ndarray] = None) -> ndarray:
+    """Накладывает 8-битное BGRA-изображение на белый фон без промежуточных копий.
+
+    Для каждого канала вычисляется min(255, c + 255 - a) в виде
+    255 - (a - min(a, c)), что не выходит за пределы uint8. Полностью
+    прозрачные пиксели становятся белыми. Результат пишется в ``out``
+    (BGR, uint8), если он передан, иначе в новый массив.
+    """
+
+    height, width = img.shape[:2]
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    alpha = img[:, :, 3:4]
+    np.minimum(img[:, :, :3], alpha, out=out)
+    np.subtract(alpha, out, out=out)
+    np.subtract(255, out, out=out)
+    return out
+
+
+def get_ocr_image(img: ndarray, predict_img: ndarray) -> ndarray:
+    """Подготавливает изображение для OCR: накладывает прозрачность на белый фон."""
+
+    if img.ndim == 3 and img.shape[2] == 4:
+        return composite_on_white(_to_uint8(img))
+    # Без альфа-канала OCR работает с тем же BGR-изображением, что и детекция
+    return predict_img
+
+
+def get_predict_image(img: ndarray) -> ndarray:
+    """Приводит декодированное изображение к 8-битному BGR для детекции объектов."""
 
-    img = cv2.imread(image_path)
+    img = _to_uint8(img)
+    if img.ndim == 2:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
     return img
 
 
-def get_ocr_and_predict_images(path: str):
-    """Возвращает изображения для OCR и детекции, удаляет исходный файл."""
+def get_ocr_and_predict_images(img: Optional[ndarray]) -> Tuple[Optional[ndarray], Optional[ndarray]]:
+    """Возвращает изображения для OCR и детекции из одного декодированного буфера."""
 
-    ocr_img = get_ocr_image(path)
-    predict_img = get_predict_image(path)
-    if ocr_img is not None and predict_img is not None:
-        os.remove(path)
+    if img is None:
+        return None, None
+    predict_img = get_predict_image(img)
+    ocr_img = get_ocr_image(img, predict_img)
     return ocr_img, predict_img
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Период проверки задержки цикла событий, с (0 — мониторинг выключен)
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Границы корзин: от единиц миллисекунд (декодирование, привязка) до минут (OCR больших схем)
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_DURATION = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Длительность этапа обработки запроса",
+    ["stage"],
+    buckets=_STAGE_BUCKETS,
+)
+REQUEST_DURATION = Histogram(
+    "pipeline_request_duration_seconds",
+    "Полное время обработки запроса",
+    ["endpoint", "status"],
+    buckets=_STAGE_BUCKETS,
+)
+REQUESTS = Counter(
+    "pipeline_requests_total",
+    "Число обработанных запросов",
+    ["endpoint", "status"],
+)
+EXECUTOR_QUEUE_WAIT = Histogram(
+    "pipeline_executor_queue_wait_seconds",
+    "Ожидание свободного воркера исполнителя моделей и OCR",
+    ["task"],
+    buckets=_STAGE_BUCKETS,
+)
+EXECUTOR_IN_FLIGHT = Gauge(
+    "pipeline_executor_in_flight",
+    "Задачи, отправленные в исполнитель и ещё не завершённые",
+)
+EVENT_LOOP_LAG = Histogram(
+    "pipeline_event_loop_lag_seconds",
+    "Опоздание пробуждения цикла событий относительно запланированного",
+    buckets=_LAG_BUCKETS,
+)
+
+_current_timings: contextvars.ContextVar = contextvars.ContextVar(
+    "request_timings", default=None)
+
+
+class RequestTimings:
+    """Длительности этапов одного запроса для гистограмм и заголовка Server-Timing."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self._stages: List[Tuple[str, float]] = []
+
+    def add(self, stage: str, seconds: float, observe: bool = True):
+        self._stages.append((stage, seconds))
+        if observe:
+            STAGE_DURATION.labels(stage).observe(seconds)
+
+    def finish(self, status: int):
+        """Фиксирует полное время запроса в гистограмме и счётчике."""
+        status_label = str(status)
+        REQUEST_DURATION.labels(self.endpoint, status_label).observe(
+            time.perf_counter() - self.start)
+        REQUESTS.labels(self.endpoint, status_label).inc()
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing: этапы и полное время в миллисекундах."""
+        totals: Dict[str, float] = {}
+        for stage, seconds in self._stages:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def request_timings(endpoint: str):
+    """Контекст запроса: этапы, замеренные внутри, попадают в его RequestTimings."""
+    timings = RequestTimings(endpoint)
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current_timings.get()
+
+
+def record_stage(stage: str, seconds: float, observe: bool = True):
+    """Записывает этап в текущий запрос и (если observe) в гистограмму этапов."""
+    timings = current_timings()
+    if timings is not None:
+        timings.add(stage, seconds, observe)
+    elif observe:
+        STAGE_DURATION.labels(stage).observe(seconds)
+
+
+@contextmanager
+def stage(name: str):
+    """Замеряет синхронный этап обработки."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def _timed_call(fn, submitted_at: float, *args):
+    """Выполняется в воркере: возвращает результат, ожидание в очереди и время работы.
+
+    Используется time.time(), так как в режиме процессов отметка отправки
+    сделана в другом процессе.
+    """
+    started_at = time.time()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+async def run_in_executor(executor, stage_name: str, fn, *args):
+    """Запускает fn в исполнителе, записывая ожидание свободного воркера и время этапа."""
+    loop = asyncio.get_event_loop()
+    EXECUTOR_IN_FLIGHT.inc()
+    try:
+        result, queue_wait, run_time = await loop.run_in_executor(
+            executor, _timed_call, fn, time.time(), *args)
+    finally:
+        EXECUTOR_IN_FLIGHT.dec()
+    queue_wait = max(0.0, queue_wait)
+    EXECUTOR_QUEUE_WAIT.labels(stage_name).observe(queue_wait)
+    # Ожидание уже учтено в своей гистограмме, в Server-Timing — отдельным этапом
+    record_stage(f"{stage_name}_wait", queue_wait, observe=False)
+    record_stage(stage_name, run_time)
+    return result
+
+
+async def _watch_event_loop_lag(interval: float):
+    loop = asyncio.get_event_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - scheduled))
+
+
+_lag_task: Optional[asyncio.Task] = None
+
+
+def start_event_loop_monitor():
+    """Запускает фоновый замер задержки цикла событий (обработчик startup)."""
+    global _lag_task
+    if EVENT_LOOP_LAG_INTERVAL > 0 and _lag_task is None:
+        _lag_task = asyncio.get_event_loop().create_task(
+            _watch_event_loop_lag(EVENT_LOOP_LAG_INTERVAL))
+
+
+def stop_event_loop_monitor():
+    """Останавливает замер задержки цикла событий (обработчик shutdown)."""
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        _lag_task = None
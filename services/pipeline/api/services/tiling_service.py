@@ -0,0 +1,110 @@
+import os
+from typing import List, Tuple
+
+import torch
+from detectron2.structures import Boxes, Instances
+from numpy import ndarray
+from torchvision.ops import batched_nms
+
+# Максимальная сторона изображения без нарезки на тайлы, px (0 — нарезка выключена)
+PREDICT_TILE_THRESHOLD = int(os.getenv("PREDICT_TILE_THRESHOLD", "0"))
+# Сторона тайла, px. 800 совпадает с INPUT.MIN_SIZE_TEST, тайл не масштабируется
+PREDICT_TILE_SIZE = int(os.getenv("PREDICT_TILE_SIZE", "800"))
+# Перекрытие соседних тайлов, px
+PREDICT_TILE_OVERLAP = int(os.getenv("PREDICT_TILE_OVERLAP", "160"))
+# Сколько тайлов обрабатывать за один прямой проход
+PREDICT_TILE_BATCH = int(os.getenv("PREDICT_TILE_BATCH", "4"))
+# Порог IoU при слиянии дубликатов
+PREDICT_TILE_NMS_IOU = float(os.getenv("PREDICT_TILE_NMS_IOU", "0.5"))
+
+# Рамки, касающиеся внутренней границы тайла ближе этого расстояния, обрезаны тайлом
+_EDGE_MARGIN = 2.0
+
+Tile = Tuple[int, int, int, int]
+
+
+def needs_tiling(img: ndarray) -> bool:
+    """Нужно ли детектировать изображение по тайлам."""
+    return PREDICT_TILE_THRESHOLD > 0 and max(img.shape[:2]) > PREDICT_TILE_THRESHOLD
+
+
+def tile_origins(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Начала тайлов вдоль одной оси; последний тайл прижат к краю."""
+    if length <= tile_size:
+        return [0]
+    step = max(1, tile_size - overlap)
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def make_tiles(width: int, height: int) -> List[Tile]:
+    """Разбивает холст на перекрывающиеся тайлы (x0, y0, x1, y1)."""
+    return [
+        (x0, y0, min(x0 + PREDICT_TILE_SIZE, width),
+         min(y0 + PREDICT_TILE_SIZE, height))
+        for y0 in tile_origins(height, PREDICT_TILE_SIZE, PREDICT_TILE_OVERLAP)
+        for x0 in tile_origins(width, PREDICT_TILE_SIZE, PREDICT_TILE_OVERLAP)
+    ]
+
+
+def _to_global(instances: Instances, tile: Tile, image_size: Tuple[int, int]) -> Instances:
+    """Переносит предсказания тайла в координаты всего изображения.
+
+    Отбрасывает рамки, обрезанные внутренней границей тайла: объекты меньше
+    перекрытия целиком попадают в соседний тайл, крупные — в общий проход.
+    """
+    x0, y0, x1, y1 = tile
+    height, width = image_size
+    offset = torch.tensor([x0, y0, x0, y0], dtype=torch.float32)
+
+    shifted = Instances(image_size)
+    for name, value in instances.get_fields().items():
+        if name == "pred_boxes":
+            value = Boxes(value.tensor + offset)
+        elif name == "pred_keypoints":
+            value = value.clone()
+            value[:, :, 0] += x0
+            value[:, :, 1] += y0
+        shifted.set(name, value)
+
+    boxes = shifted.pred_boxes.tensor
+    keep = torch.ones(len(shifted), dtype=torch.bool)
+    if x0 > 0:
+        keep &= boxes[:, 0] > x0 + _EDGE_MARGIN
+    if y0 > 0:
+        keep &= boxes[:, 1] > y0 + _EDGE_MARGIN
+    if x1 < width:
+        keep &= boxes[:, 2] < x1 - _EDGE_MARGIN
+    if y1 < height:
+        keep &= boxes[:, 3] < y1 - _EDGE_MARGIN
+    return shifted[keep]
+
+
+def predict_tiled(predictor, img: ndarray) -> dict:
+    """Детекция большого изображения: общий проход плюс тайлы в исходном масштабе.
+
+    Общий проход по уменьшенному изображению находит крупные объекты (пулы),
+    тайлы — мелкие события и стрелки. Дубликаты объединяются NMS по классам.
+    Возвращает словарь того же вида, что и DefaultPredictor.
+    """
+    height, width = img.shape[:2]
+    image_size = (height, width)
+
+    parts = [predictor.predict(img)["instances"]]
+    tiles = make_tiles(width, height)
+    for start in range(0, len(tiles), max(1, PREDICT_TILE_BATCH)):
+        chunk = tiles[start:start + max(1, PREDICT_TILE_BATCH)]
+        outputs = predictor.predict_batch(
+            [img[y0:y1, x0:x1] for x0, y0, x1, y1 in chunk])
+        for tile, output in zip(chunk, outputs):
+            parts.append(_to_global(output["instances"], tile, image_size))
+
+    merged = Instances.cat(parts)
+    keep = batched_nms(
+        merged.pred_boxes.tensor,
+        merged.scores,
+        merged.pred_classes,
+        PREDICT_TILE_NMS_IOU,
+    )
+    return {"instances": merged[keep]}
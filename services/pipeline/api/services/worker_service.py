@@ -0,0 +1,122 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# thread — пул потоков в процессе сервера, process — отдельные процессы-воркеры
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "thread")
+# Размер пула потоков для режима thread
+PIPELINE_EXECUTOR_WORKERS = int(os.getenv("PIPELINE_EXECUTOR_WORKERS", "3"))
+# Число потоков torch внутри одного процесса-воркера
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "1"))
+# Число процессов-воркеров для режима process (по умолчанию — по ядрам)
+INFERENCE_WORKERS = int(os.getenv(
+    "INFERENCE_WORKERS",
+    str(max(1, (os.cpu_count() or 1) // max(1, TORCH_THREADS_PER_WORKER))),
+))
+
+
+def _init_worker(torch_threads: int):
+    """Инициализирует процесс-воркер: ограничивает потоки torch и загружает модели."""
+    import torch
+    from api.services import predict_service as ps
+
+    torch.set_num_threads(torch_threads)
+    ps.get_object_predictor()
+    ps.get_keypoint_predictor()
+    logger.info("Воркер %d готов (потоков torch: %d)",
+                os.getpid(), torch_threads)
+
+
+class InferenceWorkerPool(Executor):
+    """Пул процессов-воркеров, каждый из которых один раз загружает модели.
+
+    Задачи передаются через очередь ProcessPoolExecutor. Если воркер падает,
+    пул помечается сломанным — он пересоздаётся при следующей задаче или
+    сразу после обнаружения сбоя, после чего вызываются обработчики
+    add_restart_callback (новые воркеры загружают модели заново).
+    """
+
+    def __init__(self, max_workers: int, torch_threads: int):
+        self.max_workers = max_workers
+        self.torch_threads = torch_threads
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._restart_callbacks: List[Callable[[], None]] = []
+        self._executor = self._create_executor()
+
+    def add_restart_callback(self, callback: Callable[[], None]):
+        """Регистрирует вызов после пересоздания пула (вне блокировки пула)."""
+        self._restart_callbacks.append(callback)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,),
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> bool:
+        """Пересоздаёт пул, если он ещё не пересоздан; вызывается под блокировкой."""
+        if self._executor is not broken:
+            return False
+        logger.warning("Пул воркеров сломан, перезапуск (%d)",
+                       self.restarts + 1)
+        broken.shutdown(wait=False)
+        self._executor = self._create_executor()
+        self.restarts += 1
+        return True
+
+    def _notify_restart(self):
+        for callback in self._restart_callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Ошибка обработчика перезапуска пула воркеров")
+
+    def _on_done(self, future: Future, executor: ProcessPoolExecutor):
+        if future.cancelled():
+            return
+        if isinstance(future.exception(), BrokenProcessPool):
+            with self._lock:
+                restarted = self._restart(executor)
+            if restarted:
+                self._notify_restart()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        restarted = False
+        with self._lock:
+            executor = self._executor
+            try:
+                future = executor.submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                restarted = self._restart(executor)
+                executor = self._executor
+                future = executor.submit(fn, *args, **kwargs)
+
+        future.add_done_callback(lambda f: self._on_done(f, executor))
+        if restarted:
+            self._notify_restart()
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def uses_worker_processes() -> bool:
+    """Выполняются ли модели в отдельных процессах."""
+    return INFERENCE_MODE == "process"
+
+
+def create_executor() -> Executor:
+    """Создаёт исполнитель для моделей и OCR согласно INFERENCE_MODE."""
+    if uses_worker_processes():
+        return InferenceWorkerPool(INFERENCE_WORKERS, TORCH_THREADS_PER_WORKER)
+    return ThreadPoolExecutor(max_workers=PIPELINE_EXECUTOR_WORKERS)
@@ -1,11 +1,16 @@
 from commons.utils import here
-from api.resources.convert_resource import convert_image
-from api.resources.metrics_resource import get_metrics
+from api.resources.convert_resource import convert_image, shutdown_executor, start_models
+from api.resources.health_resource import get_live, get_ready
+from api.resources.batch_resource import convert_batch
+from api.resources.metrics_resource import get_metrics, get_prometheus_metrics
+from api.services.sampler_service import resource_sampler
+from api.services.telemetry_service import start_event_loop_monitor, stop_event_loop_monitor
 from fastapi.responses import PlainTextResponse
 from starlette.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 import uvicorn
+import argparse
 import os
 import sys
 sys.path.append('.')
@@ -18,22 +23,58 @@ def create_app():
         CORSMiddleware,
         allow_origins=['*'],
         allow_methods=['*'],
-        allow_headers=['*']
+        allow_headers=['*'],
+        expose_headers=['Server-Timing', 'X-Cache', 'X-Processing-Time-Ms']
     )
 
+    app.add_event_handler('startup', start_models)
+    app.add_event_handler('startup', start_event_loop_monitor)
+    app.add_event_handler('startup', resource_sampler.start)
+    app.add_event_handler('shutdown', stop_event_loop_monitor)
+    app.add_event_handler('shutdown', resource_sampler.stop)
+    app.add_event_handler('shutdown', shutdown_executor)
+
+    app.get(
+        '/health/live',
+        summary='Liveness-проба',
+        description='Процесс запущен и отвечает на запросы.'
+    )(get_live)
+
+    app.get(
+        '/health/ready',
+        summary='Readiness-проба',
+        description='Состояние загрузки и прогрева каждой модели; 503, пока модели не готовы.'
+    )(get_ready)
+
     app.post(
         '/api/v1/convert',
-        summary='Конвертация изображения в JSON описание',
-        description='Принимает изображение и возвращает JSON описание процесса.',
+        summary='Конвертация изображения в JSON описание или BPMN XML',
+        description='Принимает изображение и возвращает JSON описание процесса '
+                    '(format=json) или BPMN XML (format=bpmn).',
         response_class=PlainTextResponse
     )(convert_image)
 
+    app.post(
+        '/api/v1/convert/batch',
+        summary='Пакетная конвертация изображений',
+        description='Принимает список изображений и/или zip-архивов и возвращает '
+                    'NDJSON, по строке на изображение по мере готовности.'
+    )(convert_batch)
+
     app.get(
         '/api/v1/metrics',
         summary='Метрики использования ресурсов',
-        description='Возвращает метрики CPU, RAM и диска для контейнера.'
+        description='Возвращает текущие метрики CPU, RAM, диска и cgroup контейнера '
+                    'и min/avg/max за последнее окно.'
     )(get_metrics)
 
+    app.get(
+        '/metrics',
+        summary='Метрики Prometheus',
+        description='Гистограммы длительности этапов, ожидания исполнителя и задержки цикла событий.',
+        response_class=PlainTextResponse
+    )(get_prometheus_metrics)
+
     static_files_folder = here("static")
     if os.path.exists(static_files_folder) and os.path.isdir(static_files_folder):
         app.mount('/', StaticFiles(directory=static_files_folder, html=True))
@@ -42,5 +83,18 @@ def create_app():
 
 
 if __name__ == "__main__":
-    uvicorn.run(create_app(), host='0.0.0.0', port=int(
-        os.environ.get("BACKEND_PORT", "5000")))
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="замерить импорт модулей и загрузку моделей и выйти")
+    parser.add_argument("--profile-output", metavar="PATH",
+                        help="файл для JSON-отчёта --profile-startup (по умолчанию stdout)")
+    parser.add_argument("--skip-models", action="store_true",
+                        help="в --profile-startup не загружать модели")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from commons.startup_profiler import profile_startup, write_report
+        write_report(profile_startup(load_models=not args.skip_models), args.profile_output)
+    else:
+        uvicorn.run(create_app(), host='0.0.0.0', port=int(
+            os.environ.get("BACKEND_PORT", "5000")))
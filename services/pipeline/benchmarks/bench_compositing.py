@@ -0,0 +1,107 @@
+"""Бенчмарк наложения прозрачности на белый фон: прежняя реализация против composite_on_white.
+
+Запуск из services/pipeline:
+    python -m benchmarks.bench_compositing
+    python -m benchmarks.bench_compositing --sizes 2000x1500 10000x8000 --repeat 5 --json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from api.services.storage_service import composite_on_white
+
+
+def legacy_get_ocr_image(img: np.ndarray) -> np.ndarray:
+    """Прежняя реализация get_ocr_image (для сравнения)."""
+
+    trans_mask = img[:, :, 3] == 0
+    img[trans_mask] = [255, 255, 255, 255]
+    img = (
+        img.astype(np.uint16)
+        + 255
+        - np.repeat(np.expand_dims(img[:, :, 3], 2), 4, axis=2)
+    )
+    img = np.ndarray.clip(img, 0, 255)
+    img = img[:, :, [0, 1, 2]]
+    return np.ascontiguousarray(img, dtype=np.uint8)
+
+
+def make_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """Случайное BGRA-изображение с четвертью полностью прозрачных пикселей."""
+
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+    img[::2, ::2, 3] = 0
+    return img
+
+
+def measure(fn, img: np.ndarray, repeat: int) -> dict:
+    """Медианная задержка и пиковая дополнительная память одного вызова."""
+
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        source = img.copy()
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(source)
+        timings.append((time.perf_counter() - start) * 1000)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "latency_ms": round(float(np.median(timings)), 3),
+        "peak_bytes": peak,
+    }
+
+
+def run(sizes, repeat: int) -> list:
+    results = []
+    for width, height in sizes:
+        img = make_image(width, height)
+        expected = legacy_get_ocr_image(img.copy())
+        if not np.array_equal(expected, composite_on_white(img.copy())):
+            raise AssertionError(f"Результаты расходятся для {width}x{height}")
+        results.append({
+            "size": f"{width}x{height}",
+            "input_bytes": img.nbytes,
+            "legacy": measure(legacy_get_ocr_image, img, repeat),
+            "composite_on_white": measure(composite_on_white, img, repeat),
+        })
+    return results
+
+
+def _parse_size(value: str):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=_parse_size,
+                        default=[(1000, 800), (4000, 3000), (10000, 8000)])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true",
+                        help="вывести результаты в JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'size':>12} {'impl':>20} {'latency, ms':>12} {'peak, MiB':>10} {'peak/input':>10}")
+    for row in results:
+        for impl in ("legacy", "composite_on_white"):
+            stats = row[impl]
+            print(
+                f"{row['size']:>12} {impl:>20} {stats['latency_ms']:>12.1f} "
+                f"{stats['peak_bytes'] / 2 ** 20:>10.1f} "
+                f"{stats['peak_bytes'] / row['input_bytes']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
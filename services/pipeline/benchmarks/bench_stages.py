@@ -0,0 +1,248 @@
+"""Бенчмарк этапов пайплайна после инференса на синтетических диаграммах.
+
+Модели и OCR заменены генератором benchmarks.synthetic, поэтому бенчмарк не
+требует весов Detectron2 и Tesseract. Для каждого размера диаграммы замеряются
+медианное время и пиковая дополнительная память этапов convert, link_flows,
+link_text, elements_to_json, serialize, diagram_factory и render.
+
+Запуск из services/pipeline:
+    python -m benchmarks.bench_stages
+    python -m benchmarks.bench_stages --sizes 10 100 1000 10000 --output before.json
+    python -m benchmarks.bench_stages --output after.json --compare before.json --threshold 1.2
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.services import convert_service as cs
+from bpmn.element_factories import DiagramFactory
+from benchmarks.synthetic import generate
+from commons.id_allocator import id_scope
+
+try:
+    # ocr_service импортирует pytesseract и cv2; без них этап link_text пропускается
+    from api.services.ocr_service import link_text
+except ImportError:
+    link_text = None
+
+
+def _stage_functions(link_engine: Optional[str]) -> Dict[str, Callable[[dict], None]]:
+    """Этапы в порядке пайплайна; каждый читает и дополняет общее состояние."""
+
+    def convert_objects(state):
+        state["elements"] = cs.convert_object_predictions(state["diagram"].object_predictions)
+
+    def convert_keypoints(state):
+        state["flows"] = cs.convert_keypoint_prediction(state["diagram"].keypoint_predictions)
+
+    def link_flows(state):
+        cs.link_flows(state["flows"], state["elements"], engine=link_engine)
+        state["elements"].extend(state["flows"])
+
+    def link_texts(state):
+        link_text(state["diagram"].texts, state["elements"])
+
+    def elements_to_json(state):
+        state["json"] = cs.elements_to_json(state["elements"])
+
+    def serialize(state):
+        json.dumps(state["json"], ensure_ascii=False)
+
+    def diagram_factory(state):
+        state["bpmn"] = DiagramFactory.create_element(state["elements"])
+
+    def render(state):
+        cs.render_diagram(state["bpmn"])
+
+    stages = {
+        "convert_objects": convert_objects,
+        "convert_keypoints": convert_keypoints,
+        "link_flows": link_flows,
+        "link_text": link_texts,
+        "elements_to_json": elements_to_json,
+        "serialize": serialize,
+        "diagram_factory": diagram_factory,
+        "render": render,
+    }
+    if link_text is None:
+        del stages["link_text"]
+    return stages
+
+
+def _run_once(params: dict, stages: Dict[str, Callable], seed: int,
+              trace_memory: bool) -> Tuple[Dict[str, float], Optional[Tuple[str, str]]]:
+    """Один прогон всех этапов на свежей диаграмме (этапы изменяют элементы).
+
+    Возвращает замеры и ошибку (этап, текст), если этапу не хватило памяти;
+    следующие этапы зависят от его результата и не запускаются.
+    """
+    state = {"diagram": generate(seed=seed, **params)}
+    measurements = {}
+    with id_scope(mode="counter"):
+        for name, fn in stages.items():
+            try:
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    fn(state)
+                    measurements[name] = tracemalloc.get_traced_memory()[1] - baseline
+                else:
+                    start = time.perf_counter()
+                    fn(state)
+                    measurements[name] = (time.perf_counter() - start) * 1000
+            except MemoryError as exc:
+                return measurements, (name, f"{type(exc).__name__}: {exc}")
+    return measurements, None
+
+
+def run(sizes: List[int], pools: int, flows_ratio: float, words_ratio: float,
+        repeat: int, link_engine: Optional[str] = None, seed: int = 0) -> List[dict]:
+    stages = _stage_functions(link_engine)
+    results = []
+    for size in sizes:
+        params = {
+            "elements": size,
+            "pools": pools,
+            "flows": int(size * flows_ratio),
+            "words": int(size * words_ratio),
+        }
+        timings: Dict[str, List[float]] = {name: [] for name in stages}
+        error = None
+        for _ in range(repeat):
+            measurements, error = _run_once(params, stages, seed, trace_memory=False)
+            for name, value in measurements.items():
+                timings[name].append(value)
+            if error is not None:
+                break
+
+        peaks = {}
+        if error is None:
+            # Память — отдельным прогоном: tracemalloc сильно замедляет выполнение
+            tracemalloc.start()
+            try:
+                peaks, error = _run_once(params, stages, seed, trace_memory=True)
+            finally:
+                tracemalloc.stop()
+
+        failed_stage, message = error or (None, None)
+        stats = {
+            name: {
+                "median_ms": round(float(np.median(values)), 3),
+                "min_ms": round(min(values), 3),
+                "peak_bytes": peaks.get(name),
+            }
+            for name, values in timings.items()
+            if values and name != failed_stage
+        }
+        row = {**params, "stages": stats,
+               "total_ms": round(sum(item["median_ms"] for item in stats.values()), 3)}
+        if error is not None:
+            # Ошибка попадает в отчёт, а замеры остальных размеров продолжаются
+            stats[failed_stage] = {"error": message}
+            row["error"] = f"{failed_stage}: {message}"
+        results.append(row)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[dict]:
+    """Сравнивает медианы этапов с базовым отчётом; regression — рост больше threshold раз."""
+    previous = {row["elements"]: row for row in baseline["results"]}
+    rows = []
+    for row in current["results"]:
+        before = previous.get(row["elements"])
+        if before is None:
+            continue
+        for name, stats in row["stages"].items():
+            if "median_ms" not in stats or "median_ms" not in before["stages"].get(name, {}):
+                continue
+            old_ms = before["stages"][name]["median_ms"]
+            ratio = stats["median_ms"] / old_ms if old_ms > 0 else 1.0
+            rows.append({
+                "elements": row["elements"],
+                "stage": name,
+                "baseline_ms": old_ms,
+                "current_ms": stats["median_ms"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > threshold,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000],
+                        help="число элементов в диаграмме")
+    parser.add_argument("--pools", type=int, default=3, help="число пулов (0 — без пулов)")
+    parser.add_argument("--flows-ratio", type=float, default=1.0, help="потоков на элемент")
+    parser.add_argument("--words-ratio", type=float, default=2.0, help="слов на элемент")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--link-engine", choices=("numpy", "python"),
+                        help="реализация link_flows (по умолчанию LINK_FLOWS_ENGINE)")
+    parser.add_argument("--output", metavar="PATH", help="сохранить отчёт в JSON")
+    parser.add_argument("--json", action="store_true", help="вывести отчёт в JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="сравнить с сохранённым отчётом (--output другого коммита)")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="во сколько раз этап может замедлиться без ошибки в --compare")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": time.time(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "link_engine": args.link_engine or cs.LINK_FLOWS_ENGINE,
+            "skipped_stages": [] if link_text is not None else ["link_text"],
+        },
+        "results": run(args.sizes, args.pools, args.flows_ratio, args.words_ratio,
+                       args.repeat, args.link_engine, args.seed),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    elif not args.compare:
+        print(f"{'elements':>9} {'stage':>18} {'median, ms':>11} {'min, ms':>10} {'peak, KiB':>10}")
+        for row in report["results"]:
+            for name, stats in row["stages"].items():
+                if "error" in stats:
+                    print(f"{row['elements']:>9} {name:>18} {stats['error']}")
+                    continue
+                peak = f"{stats['peak_bytes'] / 1024:>10.1f}" if stats["peak_bytes"] is not None else f"{'-':>10}"
+                print(f"{row['elements']:>9} {name:>18} {stats['median_ms']:>11.2f} "
+                      f"{stats['min_ms']:>10.2f} {peak}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            rows = compare(json.load(baseline_file), report, args.threshold)
+        print(f"{'elements':>9} {'stage':>18} {'baseline, ms':>13} {'current, ms':>12} {'ratio':>7}")
+        for row in rows:
+            mark = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['elements']:>9} {row['stage']:>18} {row['baseline_ms']:>13.2f} "
+                  f"{row['current_ms']:>12.2f} {row['ratio']:>7.2f}{mark}")
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Генератор синтетических BPMN-диаграмм для бенчмарков.
+
+Выдаёт то же, что в пайплайне возвращают модели и OCR: ObjectPrediction
+(пулы и элементы), KeyPointPrediction (потоки) и Text (слова), — с заданным
+числом пулов, элементов, потоков и слов. Элементы раскладываются по сетке
+внутри пулов, потоки соединяют соседние элементы (sequence flow) или элементы
+разных пулов (message flow), слова лежат на элементах и потоках. По желанию
+рисуется изображение схемы, которое можно отправить в /api/v1/convert.
+"""
+import math
+import random
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from bpmn.predictions import KeyPointPrediction, ObjectPrediction, Text
+
+PARTICIPANT_LABEL = 30
+SEQUENCE_FLOW_LABEL = 0
+MESSAGE_FLOW_LABEL = 2
+
+# Категория элемента, его ширина и высота, доля в диаграмме
+ELEMENT_KINDS = (
+    (9, 100, 80, 0.55),   # task
+    (13, 50, 50, 0.12),   # exclusiveGateway
+    (17, 50, 50, 0.05),   # parallelGateway
+    (21, 36, 36, 0.06),   # startEvent
+    (16, 36, 36, 0.06),   # endEvent
+    (1, 36, 36, 0.04),    # timerIntermediateCatchEvent
+    (12, 36, 50, 0.04),   # dataObjectReference
+    (18, 100, 30, 0.08),  # textAnnotation
+)
+
+CELL_WIDTH = 160
+CELL_HEIGHT = 130
+POOL_HEADER = 30
+POOL_GAP = 20
+MARGIN = 20
+
+WORDS = (
+    "заявка", "проверить", "документы", "клиент", "оплата", "отказ", "согласовать",
+    "order", "review", "approve", "reject", "invoice", "send", "notify", "да", "нет",
+)
+
+
+@dataclass
+class SyntheticDiagram:
+    """Предсказания моделей и OCR для одной синтетической диаграммы."""
+
+    object_predictions: List[ObjectPrediction] = field(default_factory=list)
+    keypoint_predictions: List[KeyPointPrediction] = field(default_factory=list)
+    texts: List[Text] = field(default_factory=list)
+    width: int = 0
+    height: int = 0
+
+    @property
+    def elements_count(self) -> int:
+        return sum(1 for p in self.object_predictions if p.predicted_label != PARTICIPANT_LABEL)
+
+
+def _grid(count: int) -> Tuple[int, int]:
+    """Сетка примерно 3:1 по ширине — так выглядят типичные схемы процессов."""
+    if count <= 0:
+        return 0, 0
+    columns = max(1, math.ceil(math.sqrt(count * 3)))
+    return columns, math.ceil(count / columns)
+
+
+def generate(elements: int, pools: int = 1, flows: Optional[int] = None,
+             words: Optional[int] = None, seed: int = 0) -> SyntheticDiagram:
+    """Генерирует диаграмму; по умолчанию потоков столько же, сколько элементов, слов — вдвое больше."""
+    rnd = random.Random(seed)
+    flows = elements if flows is None else flows
+    words = elements * 2 if words is None else words
+    diagram = SyntheticDiagram()
+
+    kinds = [kind[:3] for kind in ELEMENT_KINDS]
+    weights = [kind[3] for kind in ELEMENT_KINDS]
+    lanes = max(1, pools)
+    per_lane = math.ceil(elements / lanes) if elements else 0
+    columns, rows = _grid(per_lane)
+
+    # (пул, элемент) — пул нужен, чтобы выбирать тип потока
+    placed: List[Tuple[int, ObjectPrediction]] = []
+    lane_top = MARGIN
+    for lane in range(lanes):
+        lane_count = min(per_lane, elements - lane * per_lane)
+        lane_height = max(1, rows) * CELL_HEIGHT + 2 * MARGIN
+        left = MARGIN + (POOL_HEADER if pools else 0)
+        if pools:
+            diagram.object_predictions.append(ObjectPrediction(
+                PARTICIPANT_LABEL, MARGIN, lane_top,
+                left + max(1, columns) * CELL_WIDTH + MARGIN, lane_top + lane_height))
+
+        for index in range(max(0, lane_count)):
+            label, width, height = rnd.choices(kinds, weights)[0]
+            row, column = divmod(index, columns)
+            x = left + column * CELL_WIDTH + (CELL_WIDTH - width) / 2 + rnd.uniform(-10, 10)
+            y = lane_top + MARGIN + row * CELL_HEIGHT + (CELL_HEIGHT - height) / 2 + rnd.uniform(-10, 10)
+            prediction = ObjectPrediction(label, x, y, x + width, y + height)
+            diagram.object_predictions.append(prediction)
+            placed.append((lane, prediction))
+        lane_top += lane_height + POOL_GAP
+
+    diagram.width = int(MARGIN * 3 + POOL_HEADER + max(1, columns) * CELL_WIDTH)
+    diagram.height = int(lane_top + MARGIN)
+
+    if len(placed) > 1:
+        for _ in range(flows):
+            index = rnd.randrange(len(placed) - 1)
+            source_lane, source = placed[index]
+            # Чаще всего поток идёт к следующему элементу, иногда — к случайному
+            target_lane, target = placed[index + 1] if rnd.random() < 0.8 else rnd.choice(placed)
+            if target is source:
+                continue
+            label = MESSAGE_FLOW_LABEL if source_lane != target_lane else SEQUENCE_FLOW_LABEL
+            tail = [source.bottom_right_x, source.center[1], 1]
+            head = [target.top_left_x, target.center[1], 1]
+            diagram.keypoint_predictions.append(KeyPointPrediction(
+                label, min(tail[0], head[0]), min(tail[1], head[1]),
+                max(tail[0], head[0]), max(tail[1], head[1]), head, tail))
+
+    anchors = [p.center for _, p in placed] + [p.center for p in diagram.keypoint_predictions]
+    for _ in range(words if anchors else 0):
+        cx, cy = rnd.choice(anchors)
+        text = rnd.choice(WORDS)
+        width, height = 8 * len(text), 14
+        x = cx - width / 2 + rnd.uniform(-20, 20)
+        y = cy - height / 2 + rnd.uniform(-15, 15)
+        diagram.texts.append(Text(text, int(x), int(y), width, height))
+
+    return diagram
+
+
+def _rectangle(img: np.ndarray, x1: float, y1: float, x2: float, y2: float, thickness: int = 2):
+    h, w = img.shape[:2]
+    x1, x2 = max(0, int(x1)), min(w, int(x2))
+    y1, y2 = max(0, int(y1)), min(h, int(y2))
+    if x1 >= x2 or y1 >= y2:
+        return
+    img[y1:y1 + thickness, x1:x2] = 0
+    img[y2 - thickness:y2, x1:x2] = 0
+    img[y1:y2, x1:x1 + thickness] = 0
+    img[y1:y2, x2 - thickness:x2] = 0
+
+
+def _line(img: np.ndarray, start: List[float], end: List[float]):
+    h, w = img.shape[:2]
+    steps = int(max(abs(end[0] - start[0]), abs(end[1] - start[1]))) + 1
+    xs = np.clip(np.linspace(start[0], end[0], steps).astype(int), 0, w - 1)
+    ys = np.clip(np.linspace(start[1], end[1], steps).astype(int), 0, h - 1)
+    img[ys, xs] = 0
+
+
+def render_image(diagram: SyntheticDiagram) -> np.ndarray:
+    """Рисует схему в BGR-изображение: рамки пулов и элементов, линии потоков, слова — штрихами."""
+    img = np.full((diagram.height, diagram.width, 3), 255, dtype=np.uint8)
+    for prediction in diagram.object_predictions:
+        _rectangle(img, *prediction.get_box_coordinates())
+    for prediction in diagram.keypoint_predictions:
+        _line(img, prediction.tail, prediction.head)
+    for text in diagram.texts:
+        # Слово — ряд коротких штрихов на высоте строки
+        for offset in range(0, int(text.width), 4):
+            x = int(text.x) + offset
+            if 0 <= x < diagram.width - 2:
+                img[max(0, text.y + 3):max(0, text.y + text.height - 3), x:x + 2] = 0
+    return img
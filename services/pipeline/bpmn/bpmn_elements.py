@@ -1,13 +1,18 @@
 from dataclasses import dataclass, field
 from typing import List
 
-from jinja2 import Environment, BaseLoader
-
 from bpmn.predictions import ObjectPrediction, Text
+from bpmn.rendering import compile_template
 
 
 class Element:
     """Базовый класс для элементов BPMN-процесса."""
+
+    shape_template = compile_template("""<bpmndi:BPMNShape id="{{ element.id }}_di" bpmnElement="{{ element.id }}" >
+        <dc:Bounds x="{{ element.prediction.top_left_x }}" y="{{ element.prediction.top_left_y }}" width="{{ element.prediction.width }}" height="{{ element.prediction.height }}" />
+      </bpmndi:BPMNShape>
+        """)
+
     def __init__(
         self,
         id: str,
@@ -16,7 +21,6 @@ class Element:
         self.id = id
         self.prediction = prediction
         self.name = []
-        self.jinja_environment = Environment(loader=BaseLoader())
         self.incoming = []
         self.outgoing = []
 
@@ -29,18 +33,18 @@ class Element:
 
     def render_shape(self):
         """Возвращает XML с информацией о форме элемента."""
-        template = """<bpmndi:BPMNShape id="{{ element.id }}_di" bpmnElement="{{ element.id }}" >
-        <dc:Bounds x="{{ element.prediction.top_left_x }}" y="{{ element.prediction.top_left_y }}" width="{{ element.prediction.width }}" height="{{ element.prediction.height }}" />
-      </bpmndi:BPMNShape>
-        """
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(element=self)
-
-        return data
+        return self.shape_template.render(element=self)
 
 
 class StartEvent(Element):
     """Стартовое событие BPMN."""
+
+    template = compile_template("""<bpmn:startEvent id="{{ start_event.id }}" name="{{ start_event.get_name() }}" />""")
+    typed_template = compile_template("""<bpmn:startEvent id="{{ start_event.id }}" name="{{ start_event.get_name() }}">
+      <bpmn:{{ start_event.type }} />
+    </bpmn:startEvent>
+        """)
+
     def __init__(
         self,
         id: str,
@@ -51,126 +55,102 @@ class StartEvent(Element):
         self.type = type
 
     def render_element(self):
-        if self.type == "startEvent":
-            template = """<bpmn:startEvent id="{{ start_event.id }}" name="{{ start_event.get_name() }}" />"""
-        else:
-            template = """<bpmn:startEvent id="{{ start_event.id }}" name="{{ start_event.get_name() }}">
-      <bpmn:{{ start_event.type }} />
-    </bpmn:startEvent>
-        """
-
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(start_event=self)
-
-        return data
+        template = self.template if self.type == "startEvent" else self.typed_template
+        return template.render(start_event=self)
 
 
 class EndEvent(Element):
     """Конечное событие BPMN."""
-    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
-        super(EndEvent, self).__init__(id, prediction)
-        self.type = type
 
-    def render_element(self):
-        if self.type == "endEvent":
-            template = """<bpmn:endEvent id="{{ end_event.id }}" name="{{ end_event.get_name() }}"/>"""
-        else:
-            template = """<bpmn:endEvent id="{{ end_event.id }}" name="{{ end_event.get_name() }}">
+    template = compile_template("""<bpmn:endEvent id="{{ end_event.id }}" name="{{ end_event.get_name() }}"/>""")
+    typed_template = compile_template("""<bpmn:endEvent id="{{ end_event.id }}" name="{{ end_event.get_name() }}">
       <bpmn:{{ end_event.type }} />
     </bpmn:endEvent>
-        """
+        """)
 
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(end_event=self)
+    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
+        super(EndEvent, self).__init__(id, prediction)
+        self.type = type
 
-        return data
+    def render_element(self):
+        template = self.template if self.type == "endEvent" else self.typed_template
+        return template.render(end_event=self)
 
 
 class IntermediateThrowEvent(Element):
     """Промежуточное событие генерации BPMN."""
-    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
-        super(IntermediateThrowEvent, self).__init__(id, prediction)
-        self.type = type
 
-    def render_element(self):
-        if self.type == "intermediateThrowEvent":
-            template = """<bpmn:intermediateThrowEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}" />"""
-        else:
-            template = """<bpmn:intermediateThrowEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}">
+    template = compile_template("""<bpmn:intermediateThrowEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}" />""")
+    typed_template = compile_template("""<bpmn:intermediateThrowEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}">
       <bpmn:{{ intermediate_event.type }} />
     </bpmn:intermediateThrowEvent>
-        """
+        """)
 
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(intermediate_event=self)
+    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
+        super(IntermediateThrowEvent, self).__init__(id, prediction)
+        self.type = type
 
-        return data
+    def render_element(self):
+        template = self.template if self.type == "intermediateThrowEvent" else self.typed_template
+        return template.render(intermediate_event=self)
 
 
 class IntermediateCatchEvent(Element):
     """Промежуточное событие ожидания BPMN."""
-    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
-        super(IntermediateCatchEvent, self).__init__(id, prediction)
-        self.type = type
 
-    def render_element(self):
-        template = """<bpmn:intermediateCatchEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}">
+    template = compile_template("""<bpmn:intermediateCatchEvent id="{{ intermediate_event.id }}" name="{{ intermediate_event.get_name() }}">
       <bpmn:{{ intermediate_event.type }} />
     </bpmn:intermediateCatchEvent>
-        """
+        """)
 
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(intermediate_event=self)
+    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
+        super(IntermediateCatchEvent, self).__init__(id, prediction)
+        self.type = type
 
-        return data
+    def render_element(self):
+        return self.template.render(intermediate_event=self)
 
 
 class Gateway(Element):
     """Шлюз BPMN."""
+
+    template = compile_template("""<bpmn:{{ gateway.type }} id="{{ gateway.id }}" name="{{ gateway.get_name() }}" />""")
+
     def __init__(self, id: str, prediction: ObjectPrediction, type: str):
         super(Gateway, self).__init__(id, prediction)
         self.type = type
 
     def render_element(self):
-        template = """<bpmn:{{ gateway.type }} id="{{ gateway.id }}" name="{{ gateway.get_name() }}" />"""
-
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(gateway=self)
-
-        return data
+        return self.template.render(gateway=self)
 
 
 class Task(Element):
     """Задача BPMN."""
+
+    template = compile_template("""<bpmn:{{ task.type }} id="{{ task.id }}" name="{{ task.get_name() }}"/>""")
+
     def __init__(self, id: str, prediction: ObjectPrediction, type: str):
         super(Task, self).__init__(id, prediction)
         self.type = type
 
     def render_element(self):
-        template = """<bpmn:{{ task.type }} id="{{ task.id }}" name="{{ task.get_name() }}"/>"""
-
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(task=self)
-
-        return data
+        return self.template.render(task=self)
 
 
 class TextAnnotation(Element):
     """Текстовая аннотация BPMN."""
-    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
-        super(TextAnnotation, self).__init__(id, prediction)
-        self.type = type
 
-    def render_element(self):
-        template = """<bpmn:textAnnotation id="{{ textAnnotation.id }}">
+    template = compile_template("""<bpmn:textAnnotation id="{{ textAnnotation.id }}">
       <bpmn:text>{{ textAnnotation.get_name() }}</bpmn:text>
     </bpmn:textAnnotation>
-        """
+        """)
 
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(textAnnotation=self)
+    def __init__(self, id: str, prediction: ObjectPrediction, type: str):
+        super(TextAnnotation, self).__init__(id, prediction)
+        self.type = type
 
-        return data
+    def render_element(self):
+        return self.template.render(textAnnotation=self)
 
 
 @dataclass()
@@ -1,11 +1,16 @@
-from jinja2 import Environment, BaseLoader
-
 from bpmn.predictions import KeyPointPrediction
+from bpmn.rendering import compile_template
 
 
 class Flow:
     """Базовый класс для потоков BPMN (стрелок)."""
 
+    shape_template = compile_template("""<bpmndi:BPMNEdge id="{{ element.id }}_di" bpmnElement="{{ element.id }}" >
+        <di:waypoint x="{{ element.prediction.tail[0] }}" y="{{ element.prediction.tail[1] }}" />
+        <di:waypoint x="{{ element.prediction.head[0] }}" y="{{ element.prediction.head[1] }}" />
+      </bpmndi:BPMNEdge>
+        """)
+
     def __init__(
         self,
         id: str,
@@ -14,7 +19,6 @@ class Flow:
         self.id = id
         self.prediction = prediction
         self.name = []
-        self.jinja_environment = Environment(loader=BaseLoader())
         self.sourceRef = None
         self.targetRef = None
 
@@ -27,20 +31,14 @@ class Flow:
 
     def render_shape(self):
         """Возвращает XML-строку с информацией о форме потока."""
-        template = """<bpmndi:BPMNEdge id="{{ element.id }}_di" bpmnElement="{{ element.id }}" >
-        <di:waypoint x="{{ element.prediction.tail[0] }}" y="{{ element.prediction.tail[1] }}" />
-        <di:waypoint x="{{ element.prediction.head[0] }}" y="{{ element.prediction.head[1] }}" />
-      </bpmndi:BPMNEdge>
-        """
-        rtemplate = self.jinja_environment.from_string(template)
-        data = rtemplate.render(element=self)
-
-        return data
+        return self.shape_template.render(element=self)
 
 
 class SequenceFlow(Flow):
     """Последовательный поток BPMN."""
 
+    template = compile_template("""<bpmn:sequenceFlow id="{{ flow.id }}" name="{{ flow.get_name() }}" sourceRef="{{ flow.sourceRef }}" targetRef="{{ flow.targetRef }}" />""")
+
     def __init__(
         self,
         id: str,
@@ -50,17 +48,14 @@ class SequenceFlow(Flow):
 
     def render_element(self):
         """Возвращает XML последовательного потока."""
-
-        template = """<bpmn:sequenceFlow id="{{ flow.id }}" name="{{ flow.get_name() }}" sourceRef="{{ flow.sourceRef }}" targetRef="{{ flow.targetRef }}" />"""
-        render_template = self.jinja_environment.from_string(template)
-        data = render_template.render(flow=self)
-
-        return data
+        return self.template.render(flow=self)
 
 
 class MessageFlow(Flow):
     """Поток сообщений BPMN."""
 
+    template = compile_template("""<bpmn:messageFlow id="{{ flow.id }}" name="{{ flow.get_name() }}" sourceRef="{{ flow.sourceRef }}" targetRef="{{ flow.targetRef }}" />""")
+
     def __init__(
         self,
         id: str,
@@ -70,9 +65,4 @@ class MessageFlow(Flow):
 
     def render_element(self):
         """Возвращает XML потока сообщений."""
-
-        template = """<bpmn:messageFlow id="{{ flow.id }}" name="{{ flow.get_name() }}" sourceRef="{{ flow.sourceRef }}" targetRef="{{ flow.targetRef }}" />"""
-        render_template = self.jinja_environment.from_string(template)
-        data = render_template.render(flow=self)
-
-        return data
+        return self.template.render(flow=self)
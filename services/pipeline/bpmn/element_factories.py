@@ -15,10 +15,8 @@ from bpmn.bpmn_elements import (
 )
 from bpmn.bpmn_flows import SequenceFlow, MessageFlow
 from bpmn.predictions import ObjectPrediction
-from commons.utils import (
-    generate_id,
-    get_nearest_element,
-)
+from commons.spatial_index import SpatialIndex
+from commons.utils import generate_id
 
 
 def calculate_width_height(
@@ -28,18 +26,10 @@ def calculate_width_height(
     return abs(x_end - x_start), abs(y_end - y_start)
 
 
-def connect_participants(participant, elements):
+def connect_participants(participant, index: SpatialIndex):
     """Находит элементы, полностью входящие в границы участника."""
 
-    return list(
-        filter(
-            lambda elem: participant.prediction.top_left_x < elem.prediction.top_left_x
-            and participant.prediction.top_left_y < elem.prediction.top_left_y
-            and participant.prediction.bottom_right_x > elem.prediction.bottom_right_x
-            and participant.prediction.bottom_right_y > elem.prediction.bottom_right_y,
-            elements,
-        )
-    )
+    return index.contained_in(participant.prediction.get_box_coordinates())
 
 
 def extend_participants(processed_participants: Set[Participant]):
@@ -50,6 +40,9 @@ def extend_participants(processed_participants: Set[Participant]):
             for el in participant.process.elements
             if not isinstance(el, SequenceFlow)
         ]
+        if not elements:
+            # Участнику достались только потоки — расширять рамку не по чему
+            continue
         min_top_x = min(map(lambda el: el.prediction.top_left_x, elements))
         min_top_y = min(map(lambda el: el.prediction.top_left_y, elements))
         max_bottom_x = max(
@@ -83,39 +76,43 @@ class DiagramFactory:
         processes = []
 
         if participants:
-            processed_elements = []
+            # Индекс строится один раз: поиск содержимого участника просматривает
+            # только ячейки сетки под его рамкой, а не весь список элементов
+            others = [elem for elem in elements if not isinstance(elem, Participant)]
+            others_index = SpatialIndex(others)
+            processed_elements = set()
             for participant in participants:
-                process_elements = connect_participants(
-                    participant,
-                    [
-                        elem
-                        for elem in elements
-                        if not isinstance(elem, Participant)
-                        and elem not in processed_elements
-                    ],
-                )
+                process_elements = [
+                    elem
+                    for elem in connect_participants(participant, others_index)
+                    if elem not in processed_elements
+                ]
                 if process_elements:
-                    processed_elements.extend(process_elements)
+                    processed_elements.update(process_elements)
                     participant.process.elements = process_elements
                     processes.append(participant.process)
                 else:
                     participant.process.id = ""
 
             if remaining_elements := [
-                el
-                for el in elements
-                if el not in processed_elements and not isinstance(el, Participant)
+                el for el in others if el not in processed_elements
             ]:
                 processed_participants = set()
+                # Если ни один участник не содержит элементов целиком,
+                # оставшиеся элементы распределяются между всеми участниками
+                parts_index = SpatialIndex(
+                    [part for part in participants if part.process.elements]
+                    or participants)
                 for element in remaining_elements:
                     if isinstance(element, MessageFlow):
                         message_flows.append(element)
                         continue
 
-                    parts = [
-                        part for part in participants if part.process.elements]
-                    closest_part = get_nearest_element(
-                        element.prediction.center, parts)
+                    closest_part = parts_index.nearest(
+                        element.prediction.center)
+                    if not closest_part.process.elements:
+                        closest_part.process.id = generate_id("Process")
+                        processes.append(closest_part.process)
                     processed_participants.add(closest_part)
                     closest_part.process.elements.append(element)
 
@@ -140,7 +137,6 @@ class DiagramFactory:
 
 class BPMNFactory:
     """Базовый класс для фабрик создания BPMN-элементов."""
-    generated_ids = []
 
     def create_element(self, prediction: ObjectPrediction) -> Union[Element, Participant]:
         """Создаёт элемент BPMN."""
@@ -155,13 +151,7 @@ class GenericElementFactory(BPMNFactory):
 
     def create_element(self, prediction: ObjectPrediction) -> Element:
         """Создаёт элемент BPMN указанного класса."""
-        while (True):
-            id = generate_id(self.element_class.__name__)
-
-            if id not in self.generated_ids:
-                break
-
-        self.generated_ids.append(id)
+        id = generate_id(self.element_class.__name__)
 
         return self.element_class(id, prediction, self.element_type)
 
@@ -173,7 +163,6 @@ class ParticipantFactory(BPMNFactory):
         """Создаёт участника BPMN с привязанным процессом."""
         id = generate_id("Participant")
         processRef = generate_id("Process")
-        self.generated_ids.extend([id, processRef])
 
         process = Process(processRef)
 
@@ -5,7 +5,6 @@ from commons.utils import generate_id
 
 class FlowFactory:
     """Базовый класс для фабрик создания BPMN-потоков (SequenceFlow, MessageFlow)."""
-    generated_ids = []
 
     def create_flow(self, prediction: KeyPointPrediction):
         """Возвращает соответствующий поток, связанный с фабрикой"""
@@ -18,13 +17,7 @@ class GenericFlowFactory(FlowFactory):
         self.flow_class = flow_class
 
     def create_flow(self, prediction: KeyPointPrediction) -> Flow:
-        while (True):
-            id = generate_id(self.flow_class.__name__)
-
-            if id not in self.generated_ids:
-                break
-
-        self.generated_ids.append(id)
+        id = generate_id(self.flow_class.__name__)
 
         return self.flow_class(id, prediction)
 
@@ -0,0 +1,49 @@
+import os
+from typing import Iterator
+
+from jinja2 import Environment, FileSystemLoader, Template
+
+# Каталог шаблонов задаётся относительно пакета: commons.utils.here здесь
+# недоступен из-за циклического импорта commons.utils -> bpmn.bpmn_elements
+TEMPLATES_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "commons", "templates"))
+DIAGRAM_TEMPLATE = "bpmntemplate.jinja"
+# Размер фрагмента при потоковой выдаче XML, символов
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Общее окружение для всех шаблонов: шаблоны компилируются один раз при
+# импорте, файлы не перечитываются (auto_reload=False)
+environment = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    auto_reload=False,
+    cache_size=-1,
+)
+
+
+def compile_template(source: str) -> Template:
+    """Компилирует строковый шаблон элемента в общем окружении."""
+    return environment.from_string(source)
+
+
+diagram_template = environment.get_template(DIAGRAM_TEMPLATE)
+
+
+def render_diagram(diagram) -> str:
+    """Рендерит диаграмму в BPMN XML-строку."""
+    return diagram_template.render(diagram=diagram)
+
+
+def stream_diagram(diagram, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Рендерит диаграмму по частям: фрагменты UTF-8 размером около chunk_size символов."""
+    buffer = []
+    size = 0
+    for part in diagram_template.generate(diagram=diagram):
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
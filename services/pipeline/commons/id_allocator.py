@@ -0,0 +1,78 @@
+import contextvars
+import os
+import random
+import string
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+
+# random — случайные ID, counter — счётчик по префиксу, seeded — ГПСЧ с seed запроса.
+# counter и seeded дают одинаковые ID при повторной обработке того же изображения
+ID_MODE = os.getenv("ID_MODE", "random")
+ID_MODES = ("random", "counter", "seeded")
+
+_ALPHABET = string.ascii_lowercase + string.digits
+_ID_LENGTH = 7
+
+
+def _base36(number: int) -> str:
+    digits = []
+    while True:
+        number, remainder = divmod(number, 36)
+        digits.append(_ALPHABET[26 + remainder] if remainder < 10 else _ALPHABET[remainder - 10])
+        if number == 0:
+            break
+    return "".join(reversed(digits)).rjust(_ID_LENGTH, "0")
+
+
+class IdAllocator:
+    """Выдаёт ID вида prefix_xxxxxxx, уникальные в пределах одного запроса.
+
+    Проверка уникальности — O(1) по множеству выданных ID, которое живёт
+    столько же, сколько запрос, поэтому память не растёт со временем работы
+    сервиса.
+    """
+
+    def __init__(self, mode: str = "random", seed: Optional[str] = None):
+        if mode not in ID_MODES:
+            raise ValueError(
+                f"Неизвестный режим ID {mode}, допустимые: {', '.join(ID_MODES)}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._issued: Set[str] = set()
+        self._counters: Dict[str, int] = {}
+        self._random = random.Random(seed if mode == "seeded" else None)
+
+    def generate(self, prefix: str) -> str:
+        with self._lock:
+            if self.mode == "counter":
+                number = self._counters.get(prefix, 0)
+                self._counters[prefix] = number + 1
+                return f"{prefix}_{_base36(number)}"
+
+            while True:
+                suffix = "".join(self._random.choice(_ALPHABET) for _ in range(_ID_LENGTH))
+                new_id = f"{prefix}_{suffix}"
+                if new_id not in self._issued:
+                    self._issued.add(new_id)
+                    return new_id
+
+
+_current_allocator: contextvars.ContextVar = contextvars.ContextVar(
+    "id_allocator", default=None)
+
+
+@contextmanager
+def id_scope(mode: Optional[str] = None, seed: Optional[str] = None):
+    """Контекст одного запроса: все generate_id внутри него используют общий аллокатор."""
+    allocator = IdAllocator(mode or ID_MODE, seed)
+    token = _current_allocator.set(allocator)
+    try:
+        yield allocator
+    finally:
+        _current_allocator.reset(token)
+
+
+def current_allocator() -> Optional[IdAllocator]:
+    """Аллокатор текущего контекста или None вне id_scope."""
+    return _current_allocator.get()
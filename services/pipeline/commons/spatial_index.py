@@ -0,0 +1,149 @@
+import math
+from collections import defaultdict
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+class SpatialIndex:
+    """Равномерная сетка по центрам и рамкам элементов для быстрых геометрических запросов.
+
+    Строится один раз на запрос по элементам с атрибутом ``prediction``
+    (ObjectPrediction или KeyPointPrediction). Размер ячейки по умолчанию
+    подбирается так, чтобы на ячейку приходилось около одного элемента.
+    Результаты совпадают с линейным перебором: при равных расстояниях
+    выигрывает элемент, стоящий раньше в исходном списке.
+    """
+
+    def __init__(self, elements: Sequence, cell_size: Optional[float] = None):
+        self.elements = list(elements)
+        self._centers = [el.prediction.center for el in self.elements]
+        self._boxes = [
+            (
+                el.prediction.top_left_x,
+                el.prediction.top_left_y,
+                el.prediction.bottom_right_x,
+                el.prediction.bottom_right_y,
+            )
+            for el in self.elements
+        ]
+
+        xs = [c[0] for c in self._centers] + [b[0] for b in self._boxes] + [b[2] for b in self._boxes]
+        ys = [c[1] for c in self._centers] + [b[1] for b in self._boxes] + [b[3] for b in self._boxes]
+        min_x, min_y = (min(xs), min(ys)) if xs else (0.0, 0.0)
+        max_x, max_y = (max(xs), max(ys)) if xs else (0.0, 0.0)
+        span = max(max_x - min_x, max_y - min_y, 1.0)
+
+        self.cell_size = cell_size or span / max(1.0, math.sqrt(len(self.elements)))
+        self._origin = (min_x, min_y)
+        self._min_cell = self._cell(min_x, min_y)
+        self._max_cell = self._cell(max_x, max_y)
+
+        self._center_cells = defaultdict(list)
+        for idx, (cx, cy) in enumerate(self._centers):
+            self._center_cells[self._cell(cx, cy)].append(idx)
+
+        self._box_cells = defaultdict(list)
+        for idx, (x0, y0, x1, y1) in enumerate(self._boxes):
+            for cell in self._cells_in_box(x0, y0, x1, y1):
+                self._box_cells[cell].append(idx)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (
+            int(math.floor((x - self._origin[0]) / self.cell_size)),
+            int(math.floor((y - self._origin[1]) / self.cell_size)),
+        )
+
+    def _cells_in_box(self, x0, y0, x1, y1) -> Iterator[Tuple[int, int]]:
+        """Ячейки сетки, пересекающие прямоугольник (с обрезкой по границам сетки)."""
+        ci0, cj0 = self._cell(min(x0, x1), min(y0, y1))
+        ci1, cj1 = self._cell(max(x0, x1), max(y0, y1))
+        ci0, cj0 = max(ci0, self._min_cell[0]), max(cj0, self._min_cell[1])
+        ci1, cj1 = min(ci1, self._max_cell[0]), min(cj1, self._max_cell[1])
+        for i in range(ci0, ci1 + 1):
+            for j in range(cj0, cj1 + 1):
+                yield i, j
+
+    def _ring(self, ci: int, cj: int, r: int) -> Iterator[Tuple[int, int]]:
+        """Ячейки на расстоянии r (по Чебышёву) от (ci, cj) внутри сетки."""
+        (x0, y0), (x1, y1) = self._min_cell, self._max_cell
+        if r == 0:
+            if x0 <= ci <= x1 and y0 <= cj <= y1:
+                yield ci, cj
+            return
+        for i in range(max(ci - r, x0), min(ci + r, x1) + 1):
+            for j in (cj - r, cj + r):
+                if y0 <= j <= y1:
+                    yield i, j
+        for j in range(max(cj - r + 1, y0), min(cj + r - 1, y1) + 1):
+            for i in (ci - r, ci + r):
+                if x0 <= i <= x1:
+                    yield i, j
+
+    def _distance(self, point, idx: int) -> float:
+        cx, cy = self._centers[idx]
+        return math.sqrt(pow(point[0] - cx, 2) + pow(point[1] - cy, 2))
+
+    def k_nearest(self, point: Sequence[float], k: int = 1,
+                  predicate: Optional[Callable] = None) -> List:
+        """k ближайших по центру элементов, удовлетворяющих predicate."""
+        if k <= 0 or not self.elements:
+            return []
+
+        ci, cj = self._cell(point[0], point[1])
+        (x0, y0), (x1, y1) = self._min_cell, self._max_cell
+        first_ring = max(x0 - ci, ci - x1, y0 - cj, cj - y1, 0)
+        last_ring = max(abs(ci - x0), abs(ci - x1), abs(cj - y0), abs(cj - y1))
+
+        best = []
+        for r in range(first_ring, last_ring + 1):
+            for cell in self._ring(ci, cj, r):
+                for idx in self._center_cells.get(cell, ()):
+                    if predicate is not None and not predicate(self.elements[idx]):
+                        continue
+                    best.append((self._distance(point, idx), idx))
+            if len(best) >= k:
+                best.sort()
+                del best[k:]
+                # Непросмотренные ячейки лежат не ближе r * cell_size
+                if best[-1][0] < r * self.cell_size:
+                    break
+
+        best.sort()
+        return [self.elements[idx] for _, idx in best[:k]]
+
+    def nearest(self, point: Sequence[float], predicate: Optional[Callable] = None):
+        """Ближайший по центру элемент (None, если ни один не подходит под predicate)."""
+        if not self.elements:
+            raise ValueError("Поиск ближайшего элемента в пустом списке")
+        found = self.k_nearest(point, 1, predicate)
+        return found[0] if found else None
+
+    def containing(self, point: Sequence[float], padding: float = 0.0) -> List:
+        """Элементы, рамка которых (расширенная на padding) содержит точку."""
+        x, y = point[0], point[1]
+        found = set()
+        for cell in self._cells_in_box(x - padding, y - padding, x + padding, y + padding):
+            found.update(self._box_cells.get(cell, ()))
+
+        result = []
+        for idx in sorted(found):
+            x0, y0, x1, y1 = self._boxes[idx]
+            if x0 - padding <= x <= x1 + padding and y0 - padding <= y <= y1 + padding:
+                result.append(self.elements[idx])
+        return result
+
+    def contained_in(self, box: Sequence[float]) -> List:
+        """Элементы, рамка которых строго внутри box = (x0, y0, x1, y1)."""
+        bx0, by0, bx1, by1 = box
+        found = set()
+        for cell in self._cells_in_box(bx0, by0, bx1, by1):
+            found.update(self._center_cells.get(cell, ()))
+
+        result = []
+        for idx in sorted(found):
+            x0, y0, x1, y1 = self._boxes[idx]
+            if bx0 < x0 and by0 < y0 and bx1 > x1 and by1 > y1:
+                result.append(self.elements[idx])
+        return result
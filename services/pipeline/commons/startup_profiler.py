@@ -0,0 +1,117 @@
+"""Профиль холодного старта: время импорта модулей и загрузки моделей.
+
+Запуск из services/pipeline:
+    python app.py --profile-startup
+    python app.py --profile-startup --profile-output startup.json
+"""
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+# Тяжёлые зависимости, время импорта которых отслеживается между релизами
+PROFILED_MODULES = ("torch", "detectron2", "cv2", "pytesseract", "tesserocr", "numpy", "fastapi")
+# Модуль приложения: полный импорт, который проходит сервер до приёма соединений
+APP_MODULE = "app"
+
+PIPELINE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Строка вывода python -X importtime: «import time: self | cumulative | name»
+_IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_import_times(output: str) -> List[Dict]:
+    """Разбирает вывод -X importtime: время в мс и глубина вложенности каждого модуля."""
+    records = []
+    for line in output.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        records.append({
+            "module": name,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(indent) - 1) // 2,
+        })
+    return records
+
+
+def profile_import(module: str, top: int = 10) -> Dict:
+    """Импортирует модуль в отдельном чистом интерпретаторе и возвращает его время импорта."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PIPELINE_DIR, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    records = parse_import_times(completed.stderr)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {"module": module, "ok": False, "error": error[-1] if error else "import failed"}
+
+    own = next((r for r in reversed(records) if r["module"] == module and r["depth"] == 0), None)
+    slowest = sorted(records, key=lambda r: r["self_ms"], reverse=True)[:top]
+    return {
+        "module": module,
+        "ok": True,
+        "cumulative_ms": own["cumulative_ms"] if own else None,
+        "process_wall_ms": round(wall_ms, 1),
+        "modules_imported": len(records),
+        "slowest_self_ms": [{"module": r["module"], "self_ms": r["self_ms"]} for r in slowest],
+    }
+
+
+def profile_models(warmup_runs: int, warmup_sizes: Sequence) -> Dict:
+    """Загружает и прогревает модели в текущем процессе, как это делает сервер."""
+    from api.services import predict_service as ps
+    from api.services.model_service import MODEL_NAMES
+
+    models = {}
+    for name in MODEL_NAMES:
+        start = time.perf_counter()
+        try:
+            result = ps.warm_up_model(name, warmup_runs, warmup_sizes)
+        except Exception as e:
+            models[name] = {"ok": False, "error": str(e)}
+            continue
+        models[name] = {
+            "ok": True,
+            "load_seconds": round(result["load_seconds"], 3),
+            "warmup_seconds": round(result["warmup_seconds"], 3),
+            "total_seconds": round(time.perf_counter() - start, 3),
+        }
+    return models
+
+
+def profile_startup(modules: Sequence[str] = PROFILED_MODULES, load_models: bool = True) -> Dict:
+    """Полный отчёт: импорт приложения, импорт каждой тяжёлой зависимости, загрузка моделей."""
+    from api.services.model_service import MODEL_WARMUP_RUNS, MODEL_WARMUP_SIZES, parse_sizes
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.time(),
+        "app_import": profile_import(APP_MODULE),
+        "imports": {module: profile_import(module) for module in modules},
+    }
+    if load_models:
+        sizes = parse_sizes(MODEL_WARMUP_SIZES)
+        report["warmup"] = {"runs": MODEL_WARMUP_RUNS, "sizes": [f"{w}x{h}" for w, h in sizes]}
+        report["models"] = profile_models(MODEL_WARMUP_RUNS, sizes)
+    return report
+
+
+def write_report(report: Dict, path: Optional[str] = None):
+    """Пишет отчёт в JSON-файл или, если путь не задан, в stdout."""
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if path:
+        with open(path, "w", encoding="utf-8") as report_file:
+            report_file.write(text + "\n")
+    else:
+        print(text)
@@ -1,43 +1,33 @@
-import inspect
-import math
 import os
 import random
 import string
-from typing import List, Union
+import sys
 
-from bpmn.bpmn_elements import Element, Participant
+from commons.id_allocator import current_allocator
 
 
 def generate_id(prefix: str) -> str:
-    """Генерирует случайный ID вида prefix_xxxxxxx."""
+    """Генерирует ID вида prefix_xxxxxxx.
+
+    Внутри id_scope ID выдаёт аллокатор запроса (уникальность, детерминизм),
+    вне его — случайная строка.
+    """
+    allocator = current_allocator()
+    if allocator is not None:
+        return allocator.generate(prefix)
+
     alphanumeric_str = "".join(
         random.choice(string.ascii_lowercase + string.digits) for _ in range(7)
     )
     return f"{prefix}_{alphanumeric_str}"
 
 
-def get_nearest_element(
-    center: List[int], elements: List[Union[Element, Participant]]
-) -> Union[Element, Participant]:
-    """Находит ближайший элемент к заданной точке center."""
-    nearest = min(
-        elements,
-        key=lambda x: math.sqrt(
-            pow(center[0] - x.prediction.center[0], 2)
-            + pow(center[1] - x.prediction.center[1], 2)
-        ),
-    )
-
-    return nearest
-
-
 def here(resource: str):
     """Преобразует относительный путь в абсолютный относительно вызывающего файла."""
-    stack = inspect.stack()
-    caller_frame = stack[1][0]
-    caller_module = inspect.getmodule(caller_frame)
+    # Только кадр вызывающего: inspect.stack() читал исходники всего стека вызовов
+    caller_file = sys._getframe(1).f_globals["__file__"]
     return os.path.abspath(
-        os.path.join(os.path.dirname(caller_module.__file__), resource)
+        os.path.join(os.path.dirname(caller_file), resource)
     )
 
 
@@ -0,0 +1,74 @@
+"""Экспорт моделей Detectron2 в TorchScript и проверка совпадения с eager-моделью.
+
+Примеры:
+    python export_models.py --image sample.png
+    python export_models.py --image sample.png --int8
+    python export_models.py --check sample.png --backend torchscript-int8
+"""
+import argparse
+import json
+
+from cv2 import cv2
+
+from api.services import backend_service as bs
+from api.services import predict_service as ps
+
+PREDICTORS = (
+    (ps.ObjectPredictor, ps._to_object_predictions),
+    (ps.KeyPointPredictor, ps._to_keypoint_predictions),
+)
+
+
+def export(image_path: str, int8: bool):
+    """Трассирует обе модели на изображении-примере."""
+    img = cv2.imread(image_path)
+    if img is None:
+        raise FileNotFoundError(image_path)
+
+    for predictor_class, _ in PREDICTORS:
+        predictor = predictor_class(backend="eager")
+        path = bs.export_torchscript(
+            predictor._predictor.model,
+            predictor._prepare_input(img),
+            predictor.model_name,
+            int8=int8,
+        )
+        print(f"{predictor.model_name}: {path}")
+
+
+def check(image_path: str, backend: str) -> dict:
+    """Сравнивает боксы и ключевые точки бэкенда с eager-моделью."""
+    img = cv2.imread(image_path)
+    if img is None:
+        raise FileNotFoundError(image_path)
+
+    report = {}
+    for predictor_class, convert in PREDICTORS:
+        reference = convert(predictor_class(backend="eager").predict(img))
+        candidate = convert(predictor_class(backend=backend).predict(img))
+        report[predictor_class.model_name] = bs.compare_predictions(
+            reference, candidate)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", help="изображение для трассировки")
+    parser.add_argument("--int8", action="store_true",
+                        help="квантовать Linear-слои в INT8 перед экспортом")
+    parser.add_argument("--check", metavar="IMAGE",
+                        help="сравнить бэкенд с eager-моделью на изображении")
+    parser.add_argument("--backend", default="torchscript", choices=bs.BACKENDS,
+                        help="бэкенд для проверки --check")
+    args = parser.parse_args()
+
+    if not args.image and not args.check:
+        parser.error("нужен --image или --check")
+    if args.image:
+        export(args.image, args.int8)
+    if args.check:
+        print(json.dumps(check(args.check, args.backend), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import asyncio
+import io
+import json
+import zipfile
+from typing import List
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from api.services import batch_service as bs
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def _zip(entries: dict, corrupt: str = "") -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    raw = bytearray(buffer.getvalue())
+    if corrupt:
+        # Портится сжатый поток одной записи — остальные читаются как обычно
+        with zipfile.ZipFile(io.BytesIO(bytes(raw))) as archive:
+            info = archive.getinfo(corrupt)
+        start = info.header_offset + 30 + len(info.filename.encode()) + len(info.extra)
+        for offset in range(start, start + info.compress_size):
+            raw[offset] ^= 0xFF
+    return bytes(raw)
+
+
+def _lines(response) -> list:
+    return sorted((json.loads(line) for line in response.text.splitlines()),
+                  key=lambda line: line["index"])
+
+
+def _batch_client() -> TestClient:
+    """Эндпоинт с настоящим разбором multipart, но без моделей: результат — размер файла."""
+    app = FastAPI()
+
+    async def convert_item(name: str, data: bytes) -> dict:
+        return {"status": "ok", "result": len(data)}
+
+    @app.post("/batch")
+    async def batch(images: List[UploadFile] = File(...)):
+        return StreamingResponse(bs.stream_batch(bs.iter_uploads(images, {".png"}), convert_item))
+
+    return TestClient(app)
+
+
+def test_zip_entries_become_items():
+    archive = _zip({"a.png": PNG_HEADER * 10, "dir/b.png": PNG_HEADER * 20, "c.txt": b"text"})
+    response = _batch_client().post(
+        "/batch",
+        files=[("images", ("diagrams.zip", archive, "application/zip")),
+               ("images", ("single.png", PNG_HEADER, "image/png"))])
+
+    lines = _lines(response)
+    assert [line["filename"] for line in lines] == [
+        "diagrams.zip/a.png", "diagrams.zip/dir/b.png", "diagrams.zip/c.txt", "single.png"]
+    assert [line.get("result") for line in lines] == [80, 160, None, 8]
+    assert lines[2]["status"] == "error"
+
+
+def test_corrupt_entry_fails_only_itself():
+    archive = _zip({"a.png": PNG_HEADER * 100, "b.png": PNG_HEADER * 100}, corrupt="a.png")
+    response = _batch_client().post(
+        "/batch", files=[("images", ("diagrams.zip", archive, "application/zip"))])
+
+    lines = _lines(response)
+    assert [line["status"] for line in lines] == ["error", "ok"]
+    assert lines[1]["result"] == 800
+
+
+def test_batch_endpoint_with_zip(monkeypatch):
+    """Полный эндпоинт /api/v1/convert/batch (нужны зависимости образа: cv2, torch, OCR)."""
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    app_module = pytest.importorskip("app")
+    from api.resources import batch_resource
+
+    async def run_pipeline(decoded_img, format="json", cache_key=None):
+        return {"width": int(decoded_img.shape[1])}
+
+    monkeypatch.setattr(batch_resource, "run_pipeline", run_pipeline)
+    images = {
+        f"diagram_{width}.png": cv2.imencode(".png", np.full((20, width, 3), 255, np.uint8))[1].tobytes()
+        for width in (30, 40, 50)
+    }
+
+    client = TestClient(app_module.create_app())
+    response = client.post(
+        "/api/v1/convert/batch",
+        headers={"X-Cache-Bypass": "1"},
+        files=[("images", ("diagrams.zip", _zip(images), "application/zip"))])
+
+    assert response.status_code == 200
+    lines = _lines(response)
+    assert [line["status"] for line in lines] == ["ok", "ok", "ok"]
+    assert [line["result"]["width"] for line in lines] == [30, 40, 50]
+
+
+class _Python39SpooledFile:
+    """Как SpooledTemporaryFile на Python 3.9: read/seek/tell есть, seekable() — нет."""
+
+    def __init__(self, data: bytes):
+        self._file = io.BytesIO(data)
+        self.read, self.seek, self.tell = self._file.read, self._file.seek, self._file.tell
+
+
+def test_archive_without_seekable():
+    archive = _zip({"a.png": PNG_HEADER, "b.png": PNG_HEADER * 2})
+
+    async def collect():
+        return [item async for item in bs.iter_archive("d.zip", _Python39SpooledFile(archive), {".png"})]
+
+    items = asyncio.run(collect())
+    assert items == [("d.zip/a.png", PNG_HEADER, None), ("d.zip/b.png", PNG_HEADER * 2, None)]
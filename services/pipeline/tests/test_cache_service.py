@@ -0,0 +1,12 @@
+from api.services.cache_service import ResultCache
+
+
+def test_disk_size_after_overwrite(tmp_path):
+    cache = ResultCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=1 << 20)
+
+    cache.put("a" * 40, b"x" * 100)
+    cache.put("a" * 40, b"y" * 60)
+    cache.put("b" * 40, b"z" * 10)
+
+    assert cache.stats()["disk_bytes"] == 70
+    assert cache.get("a" * 40) == b"y" * 60
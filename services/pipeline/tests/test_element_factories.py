@@ -0,0 +1,65 @@
+from api.services import convert_service as cs
+from bpmn.bpmn_elements import Participant
+from bpmn.element_factories import DiagramFactory
+from bpmn.predictions import KeyPointPrediction, ObjectPrediction
+
+PARTICIPANT_LABEL = 30
+TASK_LABEL = 9
+START_EVENT_LABEL = 21
+SEQUENCE_FLOW_LABEL = 0
+
+
+def _elements(predictions):
+    return cs.convert_object_predictions(predictions)
+
+
+def test_leftovers_without_filled_participants():
+    """Пулы найдены, но ни один элемент не лежит внутри пула целиком."""
+    elements = _elements([
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 0, 400, 150),
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 200, 400, 350),
+        # Выходят за границы пулов
+        ObjectPrediction(TASK_LABEL, 350, 50, 450, 130),
+        ObjectPrediction(START_EVENT_LABEL, -10, 260, 26, 296),
+    ])
+
+    diagram = DiagramFactory.create_element(elements)
+
+    participants = [el for el in elements if isinstance(el, Participant)]
+    placed = [el for process in diagram.processes for el in process.elements]
+    assert len(placed) == 2
+    assert len(diagram.processes) == 2
+    assert all(process.id for process in diagram.processes)
+    assert {part.process.id for part in participants} == {p.id for p in diagram.processes}
+    assert cs.render_diagram(diagram)
+
+
+def test_leftovers_join_filled_participant():
+    elements = _elements([
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 0, 400, 150),
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 200, 400, 350),
+        ObjectPrediction(TASK_LABEL, 20, 20, 120, 100),
+        ObjectPrediction(TASK_LABEL, 350, 50, 450, 130),
+    ])
+
+    diagram = DiagramFactory.create_element(elements)
+
+    assert len(diagram.processes) == 1
+    assert len(diagram.processes[0].elements) == 2
+    assert cs.render_diagram(diagram)
+
+
+def test_participant_with_only_sequence_flow_leftovers():
+    elements = _elements([
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 0, 400, 150),
+        ObjectPrediction(PARTICIPANT_LABEL, 0, 200, 400, 350),
+    ])
+    elements += cs.convert_keypoint_prediction([
+        KeyPointPrediction(SEQUENCE_FLOW_LABEL, 380, 100, 450, 120, [450, 120, 1], [380, 100, 1]),
+    ])
+
+    diagram = DiagramFactory.create_element(elements)
+
+    placed = [el for process in diagram.processes for el in process.elements]
+    assert len(placed) == 1
+    assert cs.render_diagram(diagram)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from api.services import convert_service as cs
+from bpmn.predictions import KeyPointPrediction, ObjectPrediction
+
+PARTICIPANT_LABEL = 30
+ELEMENT_LABELS = (9, 21, 16, 13)
+FLOW_LABELS = (0, 2)
+
+
+def _scene(seed: int):
+    """Случайная сцена: пулы друг под другом, элементы и стрелки на сетке 10 px."""
+    rnd = random.Random(seed)
+    predictions = [
+        ObjectPrediction(PARTICIPANT_LABEL, 0, i * 300, 1000, i * 300 + 290)
+        for i in range(seed % 4)
+    ]
+    for _ in range(rnd.randint(0, 60)):
+        x, y = rnd.randint(0, 100) * 10, rnd.randint(0, 90) * 10
+        predictions.append(ObjectPrediction(
+            rnd.choice(ELEMENT_LABELS), x, y,
+            x + rnd.choice([20, 36, 100]), y + rnd.choice([20, 36, 80])))
+
+    keypoints = []
+    for _ in range(rnd.randint(0, 60)):
+        x, y = rnd.randint(0, 100) * 10, rnd.randint(0, 90) * 10
+        x2, y2 = rnd.randint(0, 100) * 10, rnd.randint(0, 90) * 10
+        keypoints.append(KeyPointPrediction(
+            rnd.choice(FLOW_LABELS), min(x, x2), min(y, y2), max(x, x2), max(y, y2),
+            [x2, y2, 1], [x, y, 1]))
+    return predictions, keypoints
+
+
+def _link(seed: int, engine: str):
+    predictions, keypoints = _scene(seed)
+    elements = cs.convert_object_predictions(predictions)
+    flows = cs.convert_keypoint_prediction(keypoints)
+    # Идентификаторы фиксируются, чтобы результаты двух прогонов можно было сравнить
+    for i, element in enumerate(elements):
+        element.id = f"Element_{i}"
+    for i, flow in enumerate(flows):
+        flow.id = f"Flow_{i}"
+
+    cs.link_flows(flows, elements, engine=engine)
+    return (
+        [(flow.sourceRef, flow.targetRef) for flow in flows],
+        [(getattr(el, "incoming", None), getattr(el, "outgoing", None)) for el in elements],
+    )
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_numpy_matches_python(seed):
+    assert _link(seed, "numpy") == _link(seed, "python")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_blocks_match_python(seed, monkeypatch):
+    # Блоки меньше числа потоков: проверяется склейка результатов блоков
+    monkeypatch.setattr(cs, "LINK_FLOWS_BLOCK_SIZE", 7)
+    assert _link(seed, "numpy") == _link(seed, "python")
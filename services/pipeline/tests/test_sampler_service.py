@@ -0,0 +1,28 @@
+from api.services.sampler_service import ResourceSampler
+
+
+def test_snapshot_before_first_sample(monkeypatch):
+    sampler = ResourceSampler(interval=1)
+
+    def sample():
+        raise AssertionError("snapshot() не должен снимать показание сам")
+
+    monkeypatch.setattr(sampler, "sample", sample)
+    snapshot = sampler.snapshot()
+
+    assert snapshot["current"] == {}
+    assert snapshot["window"]["samples"] == 0
+
+
+def test_snapshot_aggregates_window():
+    sampler = ResourceSampler(interval=1)
+    sampler._samples.extend([
+        {"timestamp": 10.0, "cpu_percent": 10.0},
+        {"timestamp": 12.0, "cpu_percent": 30.0},
+    ])
+
+    snapshot = sampler.snapshot()
+
+    assert snapshot["current"]["cpu_percent"] == 30.0
+    assert snapshot["window"]["seconds"] == 2.0
+    assert snapshot["window"]["cpu_percent"] == {"min": 10.0, "avg": 20.0, "max": 30.0}
@@ -0,0 +1,27 @@
+import io
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+Image = pytest.importorskip("PIL.Image")
+
+from api.services import storage_service as ss  # noqa: E402
+
+
+@pytest.mark.parametrize("orientation", range(1, 9))
+def test_decode_applies_exif_orientation(orientation):
+    """Изображение для детекции совпадает с прежним cv2.imread(IMREAD_COLOR)."""
+    pixels = np.random.default_rng(orientation).integers(0, 255, (40, 24, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    exif = image.getexif()
+    exif[ss.EXIF_ORIENTATION_TAG] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes(), quality=95)
+    data = buffer.getvalue()
+
+    ocr_img, predict_img = ss.get_ocr_and_predict_images(ss.decode_image(data))
+
+    expected = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    assert np.array_equal(predict_img, expected)
+    assert ocr_img is predict_img